@@ -34,22 +34,10 @@ except ImportError:
     pass
 else:
     pygtk.require('2.0')
-import os, gtk
-
-# Register some custom icons into the default icon theme
-path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'icons', '16x16'))
-gtk.icon_theme_add_builtin_icon('compact-close', 16,
-                                gtk.gdk.pixbuf_new_from_file(os.path.join(path, 'compact-close.png')))
-gtk.icon_theme_add_builtin_icon('compact-close-prelight', 16,
-                                gtk.gdk.pixbuf_new_from_file(os.path.join(path, 'compact-close-prelight.png')))
-gtk.icon_theme_add_builtin_icon('compact-list', 16,
-                                gtk.gdk.pixbuf_new_from_file(os.path.join(path, 'compact-list.png')))
-gtk.icon_theme_add_builtin_icon('compact-minimize', 16,
-                                gtk.gdk.pixbuf_new_from_file(os.path.join(path, 'compact-minimize.png')))
-gtk.icon_theme_add_builtin_icon('compact-maximize', 16,
-                                gtk.gdk.pixbuf_new_from_file(os.path.join(path, 'compact-maximize.png')))
-gtk.icon_theme_add_builtin_icon('compact-restore', 16,
-                                gtk.gdk.pixbuf_new_from_file(os.path.join(path, 'compact-restore.png')))
+import os, sys
+
+# Our custom icons are registered into the default icon theme when the first
+# CompactButton is realized, see etkdocking.compactbutton.register_icons()
 
 # Check for elib, not required.
 try:
@@ -64,7 +52,7 @@ else:
     del localedir, install_module
 
 # Keep our namespace nice and tidy
-del os, gtk, path
+del os
 
 ############################################################################
 # GtkBuilder and Glade create GObject instances (and thus GTK+ widgets) using
@@ -72,9 +60,38 @@ del os, gtk, path
 # registered with the GObject type system when etk.docking is imported.
 # This also defines the widgets that can be considered public.
 ############################################################################
-from .docklayout import DockLayout
 from etkdocking.dockframe import DockFrame
 from .dockpaned import DockPaned
 from etkdocking.dockgroup import DockGroup
 from .dockitem import DockItem
 from .docksettings import settings
+
+############################################################################
+# DockLayout is not a widget, but it pulls in simplegeneric. It is imported on
+# first access: the module object of this package is replaced by a
+# _Package, which imports it when the attribute is looked up. Unlike module
+# level __getattr__ (PEP 562), this works on every Python version.
+############################################################################
+import types
+
+
+class _Package(types.ModuleType):
+    def __getattr__(self, name):
+        if name == 'DockLayout':
+            from .docklayout import DockLayout
+            self.DockLayout = DockLayout
+            return DockLayout
+
+        raise AttributeError('module %r has no attribute %r' % (self.__name__, name))
+
+
+_package = _Package(__name__, __doc__)
+_package.__dict__.update(globals())
+# Python 2 empties the namespace of a module object when it is collected, and
+# the functions defined here still use it
+_package._module = sys.modules[__name__]
+sys.modules[__name__] = _package
+
+# Keep our namespace nice and tidy
+del _package.sys, _package.types, _package._package
+del sys, types, _package
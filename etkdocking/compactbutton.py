@@ -22,12 +22,51 @@
 from __future__ import absolute_import
 from builtins import hex
 from logging import getLogger
+import os
 
 import gobject
 import gtk
 import gtk.gdk as gdk
 
-from .util import load_icon
+from .util import load_icon, icon_theme_generation
+
+
+_icons_registered = False
+
+
+def register_icons():
+    '''
+    Register the compact-* icons used by etk.docking as builtin icons of the
+    default icon theme. This is done once, when the first CompactButton is
+    realized. The icons are sliced from the sprite in compacticons when that
+    module is available.
+    '''
+    global _icons_registered
+
+    if _icons_registered:
+        return
+
+    try:
+        from . import compacticons
+    except ImportError:
+        # The embedded sprite is optional, decode the PNG files instead
+        path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'icons', '16x16'))
+
+        for icon_name in ('compact-close', 'compact-close-prelight', 'compact-list',
+                          'compact-minimize', 'compact-maximize', 'compact-restore'):
+            gtk.icon_theme_add_builtin_icon(icon_name, 16,
+                                            gdk.pixbuf_new_from_file(os.path.join(path, icon_name + '.png')))
+    else:
+        size = compacticons.ICON_SIZE
+        sprite = gdk.pixbuf_new_from_data(compacticons.SPRITE, gdk.COLORSPACE_RGB, True, 8,
+                                          compacticons.SPRITE_WIDTH, compacticons.SPRITE_HEIGHT,
+                                          compacticons.SPRITE_ROWSTRIDE)
+
+        for index, icon_name in enumerate(compacticons.ICON_NAMES):
+            gtk.icon_theme_add_builtin_icon(icon_name, size,
+                                            sprite.subpixbuf(index * size, 0, size, size))
+
+    _icons_registered = True
 
 
 class CompactButton(gtk.Widget):
@@ -67,9 +106,15 @@ class CompactButton(gtk.Widget):
                             'has frame',
                             'has frame',
                             True,
+                            gobject.PARAM_READWRITE),
+                       'has-input-window':
+                           (gobject.TYPE_BOOLEAN,
+                            'has input window',
+                            'has input window',
+                            True,
                             gobject.PARAM_READWRITE)}
 
-    def __init__(self, icon_name_normal='', size=16, has_frame=True):
+    def __init__(self, icon_name_normal='', size=16, has_frame=True, has_input_window=True):
         gtk.Widget.__init__(self)
         self.set_flags(self.flags() | gtk.NO_WINDOW)
 
@@ -81,8 +126,10 @@ class CompactButton(gtk.Widget):
         self._icon_normal = None
         self._icon_prelight = None
         self._icon_active = None
+        self._icon_generation = None  # Icon theme generation the icons were loaded from
         self.set_size(size)
         self.set_has_frame(has_frame)
+        self.set_has_input_window(has_input_window)
         self.set_icon_name_normal(icon_name_normal)
 
     ############################################################################
@@ -101,6 +148,8 @@ class CompactButton(gtk.Widget):
         else:
             self._icon_active = load_icon(self._icon_name_active, self._size)
 
+        self._icon_generation = icon_theme_generation()
+
     ############################################################################
     # GObject
     ############################################################################
@@ -115,6 +164,8 @@ class CompactButton(gtk.Widget):
             return self.get_size()
         elif pspec.name == 'has-frame':
             return self.get_has_frame()
+        elif pspec.name == 'has-input-window':
+            return self.get_has_input_window()
 
     def do_set_property(self, pspec, value):
         if pspec.name == 'icon-name-normal':
@@ -127,6 +178,8 @@ class CompactButton(gtk.Widget):
             self.set_size(value)
         elif pspec.name == 'has-frame':
             self.set_has_frame(value)
+        elif pspec.name == 'has-input-window':
+            self.set_has_input_window(value)
 
     def get_icon_name_normal(self):
         return self._icon_name_normal
@@ -173,11 +226,31 @@ class CompactButton(gtk.Widget):
     def set_has_frame(self, value):
         self._has_frame = value
 
+    def get_has_input_window(self):
+        return self._has_input_window
+
+    def set_has_input_window(self, value):
+        '''
+        Without an input window the button receives no events of its own. The
+        parent widget is then expected to hit test the button and emit the
+        enter-notify, leave-notify, button-press and button-release events on
+        it, saving an X window per button.
+        '''
+        assert not self.flags() & gtk.REALIZED
+        self._has_input_window = value
+
     ############################################################################
     # GtkWidget
     ############################################################################
     def do_realize(self):
         gtk.Widget.do_realize(self)
+        register_icons()
+
+        if not self._has_input_window:
+            self._input_window = None
+            self._refresh_icons()
+            return
+
         self._input_window = gdk.Window(self.get_parent_window(),
                                         x=self.allocation.x,
                                         y=self.allocation.y,
@@ -195,16 +268,22 @@ class CompactButton(gtk.Widget):
         self._refresh_icons()
 
     def do_unrealize(self):
-        self._input_window.set_user_data(None)
-        self._input_window.destroy()
+        if self._input_window:
+            self._input_window.set_user_data(None)
+            self._input_window.destroy()
+
         gtk.Widget.do_unrealize(self)
 
     def do_map(self):
-        self._input_window.show()
+        if self._input_window:
+            self._input_window.show()
+
         gtk.Widget.do_map(self)
 
     def do_unmap(self):
-        self._input_window.hide()
+        if self._input_window:
+            self._input_window.hide()
+
         gtk.Widget.do_unmap(self)
 
     def do_size_request(self, requisition):
@@ -214,10 +293,14 @@ class CompactButton(gtk.Widget):
     def do_size_allocate(self, allocation):
         self.allocation = allocation
 
-        if self.flags() & gtk.REALIZED:
+        if self.flags() & gtk.REALIZED and self._input_window:
             self._input_window.move_resize(*self.allocation)
 
     def do_expose_event(self, event):
+        # Reload icons after the icon theme changed
+        if self._icon_generation != icon_theme_generation():
+            self._refresh_icons()
+
         # Draw icon
         if self.state == gtk.STATE_NORMAL:
             pixbuf = self._icon_normal
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# vim:sw=4:et:ai
+
+# Copyright © 2010 etk.docking Contributors
+#
+# This file is part of etk.docking.
+#
+# etk.docking is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# etk.docking is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with etk.docking. If not, see <http://www.gnu.org/licenses/>.
+
+
+'''
+The compact-* icons from icons/16x16 as one pre-decoded RGBA sprite, laid out
+left to right in ICON_NAMES order. Registering the icons from here avoids
+opening and decoding six PNG files. This module is optional, when it is missing
+the PNG files are used instead.
+
+After changing the PNG files, regenerate SPRITE with::
+
+    python -m etkdocking.compacticons
+'''
+
+
+from __future__ import absolute_import, print_function
+import base64
+
+
+ICON_SIZE = 16
+ICON_NAMES = ('compact-close', 'compact-close-prelight', 'compact-list',
+              'compact-minimize', 'compact-maximize', 'compact-restore')
+SPRITE_WIDTH = ICON_SIZE * len(ICON_NAMES)
+SPRITE_HEIGHT = ICON_SIZE
+SPRITE_ROWSTRIDE = SPRITE_WIDTH * 4
+
+SPRITE = base64.b64decode('''
+7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs
+6dgA7OnYANjk+gDY5PoA2OT6ANjk+gDY5PoA2OT6ANjk+gDY5PoA2OT6ANjk+gDY5PoA2OT6ANjk
++gDY5PoA2OT6AOXt+wDs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnY
+AOzp2ADs6dgA7OnYAOzp2ADs6dgAAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8A
+AAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/
+AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8A
+AAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA7OnYAOzp2ADs6dgA7OnY
+AOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYANPh+gDT4foA
+0+H6ANPh+gDT4foA0+H6ANPh+gDT4foA0+H6ANPh+gDT4foA0+H6ANPh+gDT4foA0+H6ANPh+gDs
+6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp
+2ADs6dgAAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/
+AAAA/wAAAP8AAAD/AP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA
+/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/
+AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp
+2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAM/e+QDP3vkAz975AM/e+QDP3vkAz975
+AM/e+QDP3vkAz975AM/e+QDP3vkAz975AM/e+QDP3vkAz975AM/e+QDs6dgA7OnYAOzp2ADs6dgA
+7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgAAAD/AAAA/wAA
+AP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AP8A
+AAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAA
+AP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA
+/wAAAP8AAAD/AAAA7OnYAOzp2ADs6dgAcW9k/3FvZP9xb2T/7OnYAOzp2ADs6dgA7OnYAHFvZP9x
+b2T/cW9k/+zp2ADs6dgA7OnYAMrb+QDK2/kAytv5AHFvZP9xb2T/cW9k/8rb+QDK2/kAytv5AMrb
++QBxb2T/cW9k/3FvZP/K2/kAytv5AMrb+QDs6dgA7OnYAOzp2ABxb2T/cW9k/3FvZP9xb2T/cW9k
+/3FvZP9xb2T/cW9k/3FvZP9xb2T/7OnYAOzp2ADs6dgAAAD/AAAA/wAAAP8AcW9k/3FvZP9xb2T/
+cW9k/3FvZP9xb2T/cW9k/3FvZP9xb2T/cW9k/wAA/wAAAP8AAAD/AP8AAAD/AAAA/wAAAHFvZP9x
+b2T/cW9k/3FvZP9xb2T/cW9k/3FvZP9xb2T/cW9k/3FvZP//AAAA/wAAAP8AAAD/AAAA/wAAAP8A
+AAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA7OnY
+AOzp2ADs6dgAcW9k////////////cW9k/+zp2ADs6dgAcW9k////////////cW9k/+zp2ADs6dgA
+7OnYAMbY+ADG2PgAxtj4AHFvZP/8oKD//KCg/3FvZP/G2PgAxtj4AHFvZP/8oKD//KCg/3FvZP/G
+2PgAxtj4AMbY+ADs6dgA7OnYAOzp2ADs6dgAcW9k/////////////////////////////////3Fv
+ZP/s6dgA7OnYAOzp2ADs6dgAAAD/AAAA/wAAAP8AcW9k////////////////////////////////
+////////////cW9k/wAA/wAAAP8AAAD/AP8AAAD/AAAA/wAAAHFvZP//////////////////////
+/////////////////////3FvZP//AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAABx
+b2T/cW9k/3FvZP9xb2T/cW9k/3FvZP//AAAA/wAAAP8AAAD/AAAA7OnYAOzp2ADs6dgAcW9k////
+/////////////3FvZP9xb2T/////////////////cW9k/+zp2ADs6dgA7OnYAMHV+ADB1fgAwdX4
+AHFvZP/8oKD//KCg//ygoP9xb2T/cW9k//ygoP/8oKD//KCg/3FvZP/B1fgAwdX4AMHV+ADs6dgA
+7OnYAOzp2ADs6dgA7OnYAHFvZP//////////////////////cW9k/+zp2ADs6dgA7OnYAOzp2ADs
+6dgAAAD/AAAA/wAAAP8AcW9k////////////////////////////////////////////cW9k/wAA
+/wAAAP8AAAD/AP8AAAD/AAAA/wAAAHFvZP9xb2T/cW9k/3FvZP9xb2T/cW9k/3FvZP9xb2T/cW9k
+/3FvZP//AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAABxb2T/cW9k/3FvZP9xb2T/
+cW9k/3FvZP//AAAA/wAAAP8AAAD/AAAA7OnYAOzp2ADs6dgA7OnYAHFvZP//////////////////
+//////////////9xb2T/7OnYAOzp2ADs6dgA7OnYAL3S9wC90vcAvdL3AL3S9wBxb2T//KCg//yg
+oP/8oKD//KCg//ygoP/8oKD/cW9k/73S9wC90vcAvdL3AL3S9wDs6dgA7OnYAOzp2ADs6dgA7OnY
+AOzp2ABxb2T///////////9xb2T/7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgAAAD/AAAA/wAAAP8A
+cW9k/3FvZP9xb2T/cW9k/3FvZP9xb2T/cW9k/3FvZP9xb2T/cW9k/wAA/wAAAP8AAAD/AP8AAAD/
+AAAA/wAAAHFvZP///////////////////////////////////////////3FvZP//AAAA/wAAAP8A
+AAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAABxb2T//////////////////////3FvZP//AAAA/wAA
+AP8AAAD/AAAA7OnYAOzp2ADs6dgA7OnYAOzp2ABxb2T//////////////////////3FvZP/s6dgA
+7OnYAOzp2ADs6dgA7OnYALjP9wC4z/cAuM/3ALjP9wC4z/cAcW9k//ygoP/8oKD//KCg//ygoP9x
+b2T/uM/3ALjP9wC4z/cAuM/3ALjP9wDs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgAcW9k/3Fv
+ZP/s6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgAAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/
+AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AP8AAAD/AAAA/wAAAHFvZP//////
+/////////////////////////////////////3FvZP//AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/
+AAAAcW9k/3FvZP9xb2T/cW9k/3FvZP9xb2T//////3FvZP//AAAA/wAAAP8AAAD/AAAA7OnYAOzp
+2ADs6dgA7OnYAOzp2ABxb2T//////////////////////3FvZP/s6dgA7OnYAOzp2ADs6dgA7OnY
+ALTM9gC0zPYAtMz2ALTM9gC0zPYAcW9k//ygoP/8oKD//KCg//ygoP9xb2T/tMz2ALTM9gC0zPYA
+tMz2ALTM9gDs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs
+6dgA7OnYAOzp2ADs6dgAAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA
+/wAAAP8AAAD/AAAA/wAAAP8AAAD/AP8AAAD/AAAA/wAAAHFvZP//////////////////////////
+/////////////////3FvZP//AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAAcW9k/3FvZP9xb2T/
+cW9k/3FvZP9xb2T/cW9k/3FvZP//AAAA/wAAAP8AAAD/AAAA7OnYAOzp2ADs6dgA7OnYAHFvZP//
+//////////////////////////////9xb2T/7OnYAOzp2ADs6dgA7OnYAK/J9gCvyfYAr8n2AK/J
+9gBxb2T//KCg//ygoP/8oKD//KCg//ygoP/8oKD/cW9k/6/J9gCvyfYAr8n2AK/J9gDs6dgA7OnY
+AOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA
+AAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAA
+AP8AAAD/AP8AAAD/AAAA/wAAAHFvZP///////////////////////////////////////////3Fv
+ZP//AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAAcW9k//////////////////////9xb2T//wAA
+AP8AAAD/AAAA/wAAAP8AAAD/AAAA7OnYAOzp2ADs6dgAcW9k/////////////////3FvZP9xb2T/
+////////////////cW9k/+zp2ADs6dgA7OnYAKvG9QCrxvUAq8b1AHFvZP/8oKD//KCg//ygoP9x
+b2T/cW9k//ygoP/8oKD//KCg/3FvZP+rxvUAq8b1AKvG9QDs6dgA7OnYAOzp2ADs6dgA7OnYAOzp
+2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgAAAD/AAAA/wAAAP8AAAD/
+AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AP8AAAD/AAAA
+/wAAAHFvZP///////////////////////////////////////////3FvZP//AAAA/wAAAP8AAAD/
+AAAA/wAAAP8AAAD/AAAAcW9k//////////////////////9xb2T//wAAAP8AAAD/AAAA/wAAAP8A
+AAD/AAAA7OnYAOzp2ADs6dgAcW9k////////////cW9k/+zp2ADs6dgAcW9k////////////cW9k
+/+zp2ADs6dgA7OnYAKbD9QCmw/UApsP1AHFvZP/8oKD//KCg/3FvZP+mw/UApsP1AHFvZP/8oKD/
+/KCg/3FvZP+mw/UApsP1AKbD9QDs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs
+6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgAAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA
+/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AP8AAAD/AAAA/wAAAHFvZP//////////
+/////////////////////////////////3FvZP//AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA
+cW9k/3FvZP9xb2T/cW9k/3FvZP9xb2T//wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA7OnYAOzp2ADs
+6dgAcW9k/3FvZP9xb2T/7OnYAOzp2ADs6dgA7OnYAHFvZP9xb2T/cW9k/+zp2ADs6dgA7OnYAKLA
+9ACiwPQAosD0AHFvZP9xb2T/cW9k/6LA9ACiwPQAosD0AKLA9ABxb2T/cW9k/3FvZP+iwPQAosD0
+AKLA9ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA
+7OnYAOzp2ADs6dgAAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAA
+AP8AAAD/AAAA/wAAAP8AAAD/AP8AAAD/AAAA/wAAAHFvZP9xb2T/cW9k/3FvZP9xb2T/cW9k/3Fv
+ZP9xb2T/cW9k/3FvZP//AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAA
+AP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA
+7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAJm68wCZuvMAmbrzAJm68wCZ
+uvMAmbrzAJm68wCZuvMAmbrzAJm68wCZuvMAmbrzAJm68wCZuvMAmbrzAJm68wDs6dgA7OnYAOzp
+2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgAAAD/
+AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8A
+AAD/AP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/
+AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8A
+AAD/AAAA/wAAAP8AAAD/AAAA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnY
+AOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAJm68wCZuvMAmbrzAJm68wCZuvMAmbrzAJm68wCZuvMA
+mbrzAJm68wCZuvMAmbrzAJm68wCZuvMAmbrzAJm68wDs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs
+6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgAAAD/AAAA/wAAAP8AAAD/AAAA
+/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AP8AAAD/AAAA/wAA
+AP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA
+/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/
+AAAA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp
+2ADs6dgA7OnYAJm68wCZuvMAmbrzAJm68wCZuvMAmbrzAJm68wCZuvMAmbrzAJm68wCZuvMAmbrz
+AJm68wCZuvMAmbrzAJm68wDs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgA
+7OnYAOzp2ADs6dgA7OnYAOzp2ADs6dgAAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAA
+AP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8A
+AAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAA
+AP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA/wAAAP8AAAD/AAAA
+''')
+
+
+if __name__ == '__main__':
+    import os
+    import textwrap
+
+    import pygtk
+    pygtk.require('2.0')
+    import gtk.gdk as gdk
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'icons', '16x16')
+    rows = [[] for y in range(SPRITE_HEIGHT)]
+
+    for icon_name in ICON_NAMES:
+        pixbuf = gdk.pixbuf_new_from_file(os.path.join(path, icon_name + '.png'))
+        assert pixbuf.get_has_alpha() and pixbuf.get_width() == pixbuf.get_height() == ICON_SIZE
+        pixels = pixbuf.get_pixels()
+        rowstride = pixbuf.get_rowstride()
+
+        for y, row in enumerate(rows):
+            row.append(pixels[y * rowstride:y * rowstride + ICON_SIZE * 4])
+
+    sprite = b''.join(b''.join(row) for row in rows)
+    print('\n'.join(textwrap.wrap(base64.b64encode(sprite).decode('ascii'), 76)))
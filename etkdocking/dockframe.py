@@ -42,6 +42,7 @@ class DockFrame(gtk.Bin):
 
         # Internal housekeeping
         self._placeholder = None
+        self._child_allocation = gdk.Rectangle()
 
     ############################################################################
     # GtkWidget
@@ -59,7 +60,8 @@ class DockFrame(gtk.Bin):
         self.allocation = allocation
 
         if self.child and self.child.flags() & gtk.VISIBLE:
-            child_allocation = gdk.Rectangle()
+            # GTK+ skips the child if its allocation did not change
+            child_allocation = self._child_allocation
             child_allocation.x = allocation.x + self.border_width
             child_allocation.y = allocation.y + self.border_width
             child_allocation.width = allocation.width - (2 * self.border_width)
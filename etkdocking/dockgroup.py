@@ -23,13 +23,14 @@ from __future__ import absolute_import
 from __future__ import division
 from builtins import object
 from builtins import hex
+from builtins import chr
 from past.utils import old_div
+from collections import OrderedDict
 from logging import getLogger
 from math import pi
 from operator import attrgetter
 from time import time
 
-import cairo
 import gobject
 import gtk
 import gtk.gdk as gdk
@@ -38,8 +39,34 @@ from etkdocking import _
 from .compactbutton import CompactButton
 from .dockitem import DockItem
 from .dnd import DockDragContext, DRAG_TARGET_ITEM_LIST
-from .hslcolor import HslColor
-from .util import rect_contains
+from .hslcolor import color_to_hsl, hsl_to_rgb
+from .util import rect_contains, rect_overlaps, LayoutFreeze
+
+
+def _make_palette(style, state, tab_state):
+    '''
+    :returns: the (bg, dark, tab_light, tab_dark) rgb float tuples DockGroup
+              draws with.
+    '''
+    def rgb(color):
+        return (color.red_float, color.green_float, color.blue_float)
+
+    (h, s, l) = color_to_hsl(style.text_aa[gtk.STATE_SELECTED])
+
+    return (rgb(style.bg[state]),
+            rgb(style.dark[state]),
+            rgb(style.text_aa[tab_state]),
+            hsl_to_rgb(h, s, 0.9))
+
+
+def _search_key(text):
+    '''
+    :returns: the lower case (unicode) text to match type-ahead filters on.
+    '''
+    if isinstance(text, bytes):
+        text = text.decode('utf-8', 'replace')
+
+    return text.lower()
 
 
 class _DockGroupTab(object):
@@ -48,13 +75,12 @@ class _DockGroupTab(object):
     '''
     __slots__ = ['item',  # DockItem associated with this tab
                  'item_title_handler',  # item title property notification signal handler id
-                 'item_title_tooltip_text_handler',
-                 # item title-tooltip-text property notification signal handler id
-                 'image',  # icon (gtk.Image)
-                 'label',  # title (gtk.Label)
-                 'button',  # close button (etk.docking.CompactButton)
-                 'menu_item',  # menu item (gtk.ImageMenuItem)
+                 'item_icon_handlers',  # item icon-name and stock property notification signal handler ids
+                 'image',  # icon (gtk.Image), None until the tab is shown
+                 'label',  # title (gtk.Label), None until the tab is shown
+                 'button',  # close button (etk.docking.CompactButton), None until the tab is shown
                  'area',  # area, used for hit testing (gdk.Rectangle)
+                 'sizes',  # image, label and button size requests, None when they need measuring
                  'last_focused']  # timestamp set last time a tab was focused
 
     def __contains__(self, pos):
@@ -87,10 +113,18 @@ class DockGroup(gtk.Container):
                         (gobject.SIGNAL_RUN_LAST,
                          gobject.TYPE_NONE,
                          (gobject.TYPE_OBJECT,)),
+                    'item-reordered':
+                        (gobject.SIGNAL_RUN_LAST,
+                         gobject.TYPE_NONE,
+                         (gobject.TYPE_OBJECT,)),
                     'item-selected':
                         (gobject.SIGNAL_RUN_LAST,
                          gobject.TYPE_NONE,
-                         (gobject.TYPE_OBJECT,))}
+                         (gobject.TYPE_OBJECT,)),
+                    'items-changed':
+                        (gobject.SIGNAL_RUN_LAST,
+                         gobject.TYPE_NONE,
+                         (gobject.TYPE_PYOBJECT, gobject.TYPE_PYOBJECT))}
 
     def __init__(self):
         gtk.Container.__init__(self)
@@ -102,34 +136,59 @@ class DockGroup(gtk.Container):
         self.set_border_width(2)
         self._frame_width = 1
         self._spacing = 3
+        self._tab_button_size = 16
         self._available_width = 0
         self._decoration_area = gdk.Rectangle()
+        self._requisition_key = None  # Child sizes measured by do_size_request
+        self._allocation_key = None  # Layout inputs of the last allocation
+        self._child_allocations = []  # [(child, gdk.Rectangle), ...] of the last allocation
+        self._palettes = {}  # Map (state, tab state) -> palette, see _get_palette()
+        self._tab_surface = None  # Offscreen cairo surface holding the tab outlines
+        self._tab_surface_size = (0, 0)
+        self._tab_surface_key = None  # What _tab_surface was drawn for, see do_expose_event()
 
         self._tabs = []
+        self._tab_map = {}  # Map DockItem -> _DockGroupTab
+        self._tab_indexes = {}  # Map _DockGroupTab -> index in _tabs
+        self._indexed = 0  # _tab_indexes is valid for _tabs[:_indexed]
+        self._tabs_by_age = OrderedDict()  # Map tab -> None, most recently focused last
         self._visible_tabs = []
         self._current_tab = None
         self._tab_state = gtk.STATE_SELECTED
+        self._frozen = 0  # Nesting depth of freeze_layout()
+        self._frozen_tab = None  # Current tab when the layout was frozen
+        self._frozen_added = []  # Items added while frozen
+        self._frozen_removed = []  # Items removed while frozen
         self.dragcontext = DockDragContext()
 
+        # Our compact buttons have no input windows, events are routed to them
+        # by our own event handlers
+        self._hover_button = None  # Button under the pointer
+        self._pressed_button = None  # Button that received the last button press
+
         gtk.widget_push_composite_child()
-        self._list_button = CompactButton('compact-list')
+        self._list_button = CompactButton('compact-list', has_input_window=False)
         self._list_button.set_tooltip_text(_('Show list'))
         self._list_button.connect('clicked', self._on_list_button_clicked)
         self._list_button.set_parent(self)
-        self._min_button = CompactButton('compact-minimize')
+        self._min_button = CompactButton('compact-minimize', has_input_window=False)
         self._min_button.set_tooltip_text(_('Minimize'))
         self._min_button.connect('clicked', self._on_min_button_clicked)
         self._min_button.set_parent(self)
-        self._max_button = CompactButton('compact-maximize')
+        self._max_button = CompactButton('compact-maximize', has_input_window=False)
         self._max_button.set_tooltip_text(_('Maximize'))
         self._max_button.connect('clicked', self._on_max_button_clicked)
         self._max_button.set_parent(self)
         self._tab_menu = gtk.Menu()
         self._tab_menu.attach_to_widget(self, None)
-        self._list_menu = gtk.Menu()
-        self._list_menu.attach_to_widget(self._list_button, None)
         gtk.widget_pop_composite_child()
 
+        # The list menu is created when it is popped up
+        self._list_menu = None
+        self._list_model = []  # [(search key, tab), ...] while the list menu is shown
+        self._list_filter = ''  # Text typed while the list menu is shown
+        self._list_menu_rows = 40  # Maximum number of tabs in the list menu
+
     def __len__(self):
         return len(self._tabs)
 
@@ -149,16 +208,18 @@ class DockGroup(gtk.Container):
                                  event_mask=(gdk.EXPOSURE_MASK |
                                              gdk.POINTER_MOTION_MASK |
                                              gdk.BUTTON_PRESS_MASK |
-                                             gdk.BUTTON_RELEASE_MASK))
+                                             gdk.BUTTON_RELEASE_MASK |
+                                             gdk.LEAVE_NOTIFY_MASK))
         self.window.set_user_data(self)
         self.style.attach(self.window)
         self.style.set_background(self.window, gtk.STATE_NORMAL)
 
         # Set parent window on all child widgets
         for tab in self._tabs:
-            tab.image.set_parent_window(self.window)
-            tab.label.set_parent_window(self.window)
-            tab.button.set_parent_window(self.window)
+            if tab.image is not None:
+                tab.image.set_parent_window(self.window)
+                tab.label.set_parent_window(self.window)
+                tab.button.set_parent_window(self.window)
             tab.item.set_parent_window(self.window)
 
         self._list_button.set_parent_window(self.window)
@@ -166,6 +227,9 @@ class DockGroup(gtk.Container):
         self._max_button.set_parent_window(self.window)
 
     def do_unrealize(self):
+        self._tab_surface = self._tab_surface_key = None
+        self._tab_surface_size = (0, 0)
+        self._hover_button = self._pressed_button = None
         self.window.set_user_data(None)
         self.window.destroy()
         gtk.Container.do_unrealize(self)
@@ -184,20 +248,37 @@ class DockGroup(gtk.Container):
         self.window.hide()
         gtk.Container.do_unmap(self)
 
+    def do_style_set(self, previous_style):
+        # Fonts and icon sizes come from the style, measure the tabs again
+        for tab in self._tabs:
+            tab.sizes = None
+
+        self._tab_surface_key = None
+        self._palettes.clear()
+
+        gtk.Container.do_style_set(self, previous_style)
+
     def do_size_request(self, requisition):
         gtk.Container.do_size_request(self, requisition)
 
         # Start with a zero sized decoration area
         dw = dh = 0
+        sizes = []
 
         # Compute width and height for each tab, but only add
         # current item tab size to the decoration area requisition as
         # the other tabs can be hidden when we don't get enough room
         # in the allocation fase.
+        # Tabs are only measured again after their title, icon or style changed.
         for tab in self._tabs:
-            (iw, ih) = tab.image.size_request()
-            (lw, lh) = tab.label.size_request()
-            (bw, bh) = tab.button.size_request()
+            if tab.sizes is None:
+                if tab.image is None:
+                    tab.sizes = self._estimate_tab_sizes(tab)
+                else:
+                    tab.sizes = tab.image.size_request() + tab.label.size_request() + tab.button.size_request()
+
+            (iw, ih, lw, lh, bw, bh) = tab.sizes
+            sizes.append((tab, tab.last_focused, tab.sizes))
 
             tab.area.width = (self._frame_width + self._spacing +
                               iw + self._spacing + lw + self._spacing +
@@ -226,6 +307,8 @@ class DockGroup(gtk.Container):
         # Store decoration area size for later usage
         self._decoration_area.width = dw
         self._decoration_area.height = dh
+        self._requisition_key = (tuple(sizes), list_w, list_h, min_w, min_h, max_w, max_h,
+                                 dw, dh, self.border_width)
 
         # Current item: we only honor the height request
         if self._current_tab:
@@ -245,19 +328,32 @@ class DockGroup(gtk.Container):
         if self.flags() & gtk.REALIZED:
             self.window.move_resize(*allocation)
 
+        if self._get_allocation_key(allocation) == self._allocation_key:
+            # Neither the allocation nor the tabs changed: hand out the same
+            # allocations, children that queued a resize get their turn.
+            for child, rect in self._child_allocations:
+                child.size_allocate(rect)
+            return
+
+        child_allocations = self._child_allocations = []
+
+        def allocate(child, rect):
+            child.size_allocate(rect)
+            child_allocations.append((child, rect))
+
         # Allocate space for decoration buttons
         max_w, max_h = self._max_button.get_child_requisition()
         min_w, min_h = self._min_button.get_child_requisition()
         list_w, list_h = self._list_button.get_child_requisition()
         bh = max(list_h, min_h, max_h)
         by = self._frame_width + self._spacing
-        self._max_button.size_allocate(
-            gdk.Rectangle(allocation.width - self._frame_width - self._spacing - max_w, by, max_w, bh))
-        self._min_button.size_allocate(
-            gdk.Rectangle(allocation.width - self._frame_width - self._spacing - max_w - min_w, by, min_w, bh))
-        self._list_button.size_allocate(
-            gdk.Rectangle(allocation.width - self._frame_width - self._spacing - max_w - min_w - list_w, by, list_w,
-                          bh))
+        allocate(self._max_button,
+                 gdk.Rectangle(allocation.width - self._frame_width - self._spacing - max_w, by, max_w, bh))
+        allocate(self._min_button,
+                 gdk.Rectangle(allocation.width - self._frame_width - self._spacing - max_w - min_w, by, min_w, bh))
+        allocate(self._list_button,
+                 gdk.Rectangle(allocation.width - self._frame_width - self._spacing - max_w - min_w - list_w, by,
+                               list_w, bh))
 
         # Compute available tab area width
         self._available_width = (
@@ -277,11 +373,13 @@ class DockGroup(gtk.Container):
                 tab.item.hide()
                 tab.image.show()
                 tab.label.show()
-            elif tab.item.flags() & gtk.VISIBLE:
-                tab.item.hide()
-                tab.image.hide()
-                tab.label.hide()
-                tab.button.hide()
+            else:
+                if tab.item.flags() & gtk.VISIBLE:
+                    tab.item.hide()
+
+                # Hidden tabs do without widgets
+                if tab.image is not None:
+                    self._destroy_tab_widgets(tab)
 
         # Only show the list button when needed
         if len(self._tabs) > len(self._visible_tabs):
@@ -303,7 +401,7 @@ class DockGroup(gtk.Container):
 
             ix = cx + self._frame_width + self._spacing
             iy = old_div((tab.area.height - ih), 2) + 1
-            tab.image.size_allocate(gdk.Rectangle(ix, iy, iw, ih))
+            allocate(tab.image, gdk.Rectangle(ix, iy, iw, ih))
 
             if len(self._visible_tabs) == 1:
                 lw = tab.area.width - (self._frame_width + self._spacing + iw +
@@ -313,12 +411,12 @@ class DockGroup(gtk.Container):
 
             lx = cx + self._frame_width + self._spacing + iw + self._spacing
             ly = old_div((tab.area.height - lh), 2) + 1
-            tab.label.size_allocate(gdk.Rectangle(lx, ly, lw, lh))
+            allocate(tab.label, gdk.Rectangle(lx, ly, lw, lh))
 
             bx = (cx + self._frame_width + self._spacing + iw +
                   self._spacing + lw + self._spacing)
             by = old_div((tab.area.height - bh), 2) + 1
-            tab.button.size_allocate(gdk.Rectangle(bx, by, bw, bh))
+            allocate(tab.button, gdk.Rectangle(bx, by, bw, bh))
 
             cx += tab.area.width
 
@@ -328,33 +426,96 @@ class DockGroup(gtk.Container):
             iy = self._decoration_area.height + self.border_width
             iw = max(allocation.width - (2 * self._frame_width) - (2 * self.border_width), 0)
             ih = max(allocation.height - (2 * self._frame_width) - (2 * self.border_width) - 23, 0)
-            self._current_tab.item.size_allocate(gdk.Rectangle(ix, iy, iw, ih))
+            allocate(self._current_tab.item, gdk.Rectangle(ix, iy, iw, ih))
 
         # assert not self._current_tab or self._current_tab in self._visible_tabs
         self.queue_draw_area(0, 0, self.allocation.width, self.allocation.height)
+        self._allocation_key = self._get_allocation_key(allocation)
+
+    def _get_allocation_key(self, allocation):
+        '''
+        Everything do_size_allocate bases the layout on. If it did not change
+        since the last allocation, the layout can be reused.
+        '''
+        return (allocation.width, allocation.height, self._requisition_key,
+                self._current_tab, tuple(self._visible_tabs))
 
     def do_expose_event(self, event):
-        # Prepare colors
-        bg = self.style.bg[self.state]
-        bg = (bg.red_float, bg.green_float, bg.blue_float)
-        dark = self.style.dark[self.state]
-        dark = (dark.red_float, dark.green_float, dark.blue_float)
-        tab_light = self.style.text_aa[self._tab_state]
-        tab_light = (tab_light.red_float, tab_light.green_float, tab_light.blue_float)
-        tab_dark = HslColor(self.style.text_aa[gtk.STATE_SELECTED])
-        tab_dark.set_l(0.9)
-        tab_dark = tab_dark.get_rgb_float()
+        try:
+            # Fails if expose event happens before size request/allocate when a new
+            # current_tab has been selected.
+            visible_index = self._visible_tabs.index(self._current_tab)
+        except ValueError:
+            visible_index = -1
+
+        # Imported here, so importing etkdocking does not load cairo
+        import cairo
+
+        # The tab outlines only change when the tabs or the style do, render
+        # them once into a surface that covers the tab strip. Resizing the
+        # group does not touch it.
+        key = (tuple((t.area.x, t.area.y, t.area.width, t.area.height) for t in self._visible_tabs),
+               visible_index, self.style, self.state, self._tab_state)
+
+        if key != self._tab_surface_key:
+            width = max([t.area.x + t.area.width for t in self._visible_tabs] + [1])
+            height = max([t.area.y + t.area.height for t in self._visible_tabs] + [1])
+            (surface_width, surface_height) = self._tab_surface_size
+
+            if self._tab_surface is None or width > surface_width or height > surface_height:
+                # Leave some room, so a growing tab does not need a new surface
+                # on each step
+                width = (width + 63) // 64 * 64
+                self._tab_surface = self.window.cairo_create().get_target().create_similar(
+                    cairo.CONTENT_COLOR_ALPHA, width, height)
+                self._tab_surface_size = (width, height)
+                c = cairo.Context(self._tab_surface)
+            else:
+                c = cairo.Context(self._tab_surface)
+                c.set_operator(cairo.OPERATOR_CLEAR)
+                c.paint()
+                c.set_operator(cairo.OPERATOR_OVER)
+
+            self._draw_tabs(c, visible_index)
+            self._tab_surface_key = key
 
         # Create cairo context
         c = self.window.cairo_create()
 
         # Restrict context to the exposed area, avoid extra work
         c.rectangle(event.area.x, event.area.y, event.area.width, event.area.height)
-        c.clip_preserve()
+        c.clip()
+        self._draw_frame(c)
+        c.set_source_surface(self._tab_surface, 0, 0)
+        c.paint()
+
+        for index, tab in enumerate(self._visible_tabs):
+            if index == visible_index:
+                self.propagate_expose(self._current_tab.item, event)
+
+            # Tabs shown since the last relayout have no widgets yet
+            if tab.image is None:
+                continue
+
+            self.propagate_expose(tab.image, event)
+            self.propagate_expose(tab.label, event)
+            self.propagate_expose(tab.button, event)
+
+        self.propagate_expose(self._list_button, event)
+        self.propagate_expose(self._min_button, event)
+        self.propagate_expose(self._max_button, event)
+
+        return False
+
+    def _draw_frame(self, c):
+        '''
+        Draw the background, frame and border on cairo context `c`.
+        '''
+        (bg, dark, tab_light, tab_dark) = self._get_palette()
 
         # Draw background
         c.set_source_rgb(*bg)
-        c.fill()
+        c.paint()
 
         # Draw frame
         a = self.allocation
@@ -377,65 +538,53 @@ class DockGroup(gtk.Container):
             c.set_source_rgb(*tab_light)
             c.stroke()
 
-            # Draw tabs
-            c.set_line_width(self._frame_width)
+    def _draw_tabs(self, c, visible_index):
+        '''
+        Draw the tab outlines on cairo context `c`. visible_index is the index
+        of the current tab in _visible_tabs, or -1.
+        '''
+        import cairo
 
-            try:
-                # Fails if expose event happens before size request/allocate when a new
-                # current_tab has been selected.
-                visible_index = self._visible_tabs.index(self._current_tab)
-            except ValueError:
-                visible_index = -1
-
-            for index, tab in enumerate(self._visible_tabs):
-                tx = tab.area.x
-                ty = tab.area.y
-                tw = tab.area.width
-                th = tab.area.height
-
-                if index < visible_index and index != 0:
-                    c.move_to(tx + 0.5, ty + th)
+        (bg, dark, tab_light, tab_dark) = self._get_palette()
+        c.set_line_width(self._frame_width)
+
+        for index, tab in enumerate(self._visible_tabs):
+            tx = tab.area.x
+            ty = tab.area.y
+            tw = tab.area.width
+            th = tab.area.height
+
+            if index < visible_index and index != 0:
+                c.move_to(tx + 0.5, ty + th)
+                c.line_to(tx + 0.5, ty + 8.5)
+                c.arc(tx + 8.5, 8.5, 8, 180 * (old_div(pi, 180)), 270 * (old_div(pi, 180)))
+                c.set_source_rgb(*dark)
+                c.stroke()
+            elif index > visible_index:
+                c.arc(tx + tw - 8.5, 8.5, 8, 270 * (old_div(pi, 180)), 360 * (old_div(pi, 180)))
+                c.line_to(tx + tw - 0.5, ty + th)
+                c.set_source_rgb(*dark)
+                c.stroke()
+            elif index == visible_index:
+                c.move_to(tx + 0.5, ty + th)
+
+                if visible_index == 0:
+                    c.line_to(tx + 0.5, ty + 0.5)
+                    c.line_to(tx + tw - 8.5, ty + 0.5)
+                else:
                     c.line_to(tx + 0.5, ty + 8.5)
                     c.arc(tx + 8.5, 8.5, 8, 180 * (old_div(pi, 180)), 270 * (old_div(pi, 180)))
-                    c.set_source_rgb(*dark)
-                    c.stroke()
-                elif index > visible_index:
-                    c.arc(tx + tw - 8.5, 8.5, 8, 270 * (old_div(pi, 180)), 360 * (old_div(pi, 180)))
-                    c.line_to(tx + tw - 0.5, ty + th)
-                    c.set_source_rgb(*dark)
-                    c.stroke()
-                elif index == visible_index:
-                    c.move_to(tx + 0.5, ty + th)
-
-                    if visible_index == 0:
-                        c.line_to(tx + 0.5, ty + 0.5)
-                        c.line_to(tx + tw - 8.5, ty + 0.5)
-                    else:
-                        c.line_to(tx + 0.5, ty + 8.5)
-                        c.arc(tx + 8.5, 8.5, 8, 180 * (old_div(pi, 180)), 270 * (old_div(pi, 180)))
-                        c.line_to(tx + tw - 8.5, ty + 0.5)
-
-                    c.arc(tx + tw - 8.5, 8.5, 8, 270 * (old_div(pi, 180)), 360 * (old_div(pi, 180)))
-                    c.line_to(tx + tw - 0.5, ty + th)
-                    linear = cairo.LinearGradient(0.5, 0.5, 0.5, th)
-                    linear.add_color_stop_rgb(1, *tab_light)
-                    linear.add_color_stop_rgb(0, *tab_dark)
-                    c.set_source(linear)
-                    c.fill_preserve()
-                    c.set_source_rgb(*dark)
-                    c.stroke()
-
-                    self.propagate_expose(self._current_tab.item, event)
-
-                self.propagate_expose(tab.image, event)
-                self.propagate_expose(tab.label, event)
-                self.propagate_expose(tab.button, event)
-
-        self.propagate_expose(self._list_button, event)
-        self.propagate_expose(self._min_button, event)
-        self.propagate_expose(self._max_button, event)
-
-        return False
+                    c.line_to(tx + tw - 8.5, ty + 0.5)
+
+                c.arc(tx + tw - 8.5, 8.5, 8, 270 * (old_div(pi, 180)), 360 * (old_div(pi, 180)))
+                c.line_to(tx + tw - 0.5, ty + th)
+                linear = cairo.LinearGradient(0.5, 0.5, 0.5, th)
+                linear.add_color_stop_rgb(1, *tab_light)
+                linear.add_color_stop_rgb(0, *tab_dark)
+                c.set_source(linear)
+                c.fill_preserve()
+                c.set_source_rgb(*dark)
+                c.stroke()
 
     def do_button_press_event(self, event):
         '''
@@ -447,6 +596,15 @@ class DockGroup(gtk.Container):
         button is pressed.
         '''
 
+        # Compact buttons handle their own clicks
+        if event.window is self.window:
+            button = self._get_button_at_pos(event.x, event.y)
+
+            if button:
+                self._pressed_button = button
+                button.emit('button-press-event', event)
+                return True
+
         # We might start a DnD operation, or we could simply be starting
         # a click on a tab. Store information from this event in self.dragcontext
         # and decide in do_motion_notify_event if we're actually starting a
@@ -468,13 +626,22 @@ class DockGroup(gtk.Container):
         button is released.
         '''
 
+        # The button that got the press also gets the release, as if it
+        # had grabbed the pointer
+        if self._pressed_button:
+            button = self._pressed_button
+            self._pressed_button = None
+            button.emit('button-release-event', event)
+            self._set_hover_button(self._get_button_at_pos(event.x, event.y))
+            return True
+
         # Did we click a tab?
         clicked_tab = self.get_tab_at_pos(event.x, event.y)
 
         if clicked_tab:
             # Set the current item on left click
             if event.button == 1:
-                self.set_current_item(self._tabs.index(clicked_tab))
+                self.set_current_item(self._tab_index(clicked_tab))
             # Show context menu on right click
             elif event.button == 3:
                 # TODO: implement tab context menu
@@ -509,8 +676,17 @@ class DockGroup(gtk.Container):
         # We should not react to motion_notify_events originating from the
         # current tab's child widget
         if event.window is self.window:
+            button = self._get_button_at_pos(event.x, event.y)
+
+            # While pressed, only the pressed button lights up
+            if self._pressed_button and button is not self._pressed_button:
+                button = None
+
+            self._set_hover_button(button)
+
             # Check if we are actually starting a DnD operation
-            if event.state & gdk.BUTTON1_MASK and \
+            if not self._pressed_button and \
+                    event.state & gdk.BUTTON1_MASK and \
                     self.dragcontext.source_button == 1 and \
                     self.drag_check_threshold(int(self.dragcontext.source_x),
                                               int(self.dragcontext.source_y),
@@ -533,6 +709,9 @@ class DockGroup(gtk.Container):
 
             # Update tab button visibility
             for tab in self._visible_tabs:
+                if tab.button is None:
+                    continue
+
                 if (event.x, event.y) in tab:
                     # Update tooltip for tab under the cursor
                     self.set_tooltip_text(tab.item.get_title_tooltip_text())
@@ -543,6 +722,43 @@ class DockGroup(gtk.Container):
 
         return True
 
+    def do_leave_notify_event(self, event):
+        if event.window is self.window:
+            self._set_hover_button(None)
+
+        return False
+
+    def _get_button_at_pos(self, x, y):
+        '''
+        :param x: the x coordinate of the position.
+        :param y: the y coordinate of the position.
+        :returns: the mapped compact button at the position, or None.
+        '''
+        buttons = [self._list_button, self._min_button, self._max_button]
+        buttons.extend(tab.button for tab in self._visible_tabs)
+
+        for button in buttons:
+            if button and button.flags() & gtk.MAPPED and rect_overlaps(button.allocation, x, y):
+                return button
+
+        return None
+
+    def _set_hover_button(self, button):
+        '''
+        Send leave and enter notify events to compact buttons as the pointer
+        moves from `_hover_button` to `button`.
+        '''
+        if button is self._hover_button:
+            return
+
+        if self._hover_button:
+            self._hover_button.emit('leave-notify-event', gdk.Event(gdk.LEAVE_NOTIFY))
+
+        self._hover_button = button
+
+        if button:
+            button.emit('enter-notify-event', gdk.Event(gdk.ENTER_NOTIFY))
+
     ############################################################################
     # GtkWidget drag source
     ############################################################################
@@ -557,7 +773,7 @@ class DockGroup(gtk.Container):
         '''
         # Free the item for transport.
         for item in self.dragcontext.dragged_object:
-            self._dragged_tab_index = [t.item for t in self._tabs].index(item)
+            self._dragged_tab_index = self.item_num(item)
             self.remove_item(self._dragged_tab_index)
 
         # TODO: Set drag icon to be empty
@@ -643,9 +859,10 @@ class DockGroup(gtk.Container):
         # Internal widgets
         if internals:
             for tab in self._tabs:
-                callback(tab.image, data)
-                callback(tab.label, data)
-                callback(tab.button, data)
+                if tab.image is not None:
+                    callback(tab.image, data)
+                    callback(tab.label, data)
+                    callback(tab.button, data)
 
             callback(self._list_button, data)
             callback(self._min_button, data)
@@ -656,36 +873,37 @@ class DockGroup(gtk.Container):
             callback(tab.item, data)
 
     def do_add(self, widget):
-        if widget not in (tab.item for tab in self._tabs):
+        if widget not in self._tab_map:
             self._insert_item(widget)
 
     def do_remove(self, widget):
         self._remove_item(widget)
 
     def _remove_item(self, child):
-        assert child in (tab.item for tab in self._tabs)
+        assert child in self._tab_map
 
-        item_num = self.item_num(child)
-        tab = self._tabs[item_num]
+        tab = self._tab_map[child]
+        item_num = self._tab_index(tab)
 
         # We need this to reset the current item below
-        old_tab_index = self._tabs.index(self._current_tab)
+        old_tab_index = self._tab_index(self._current_tab)
 
         # Remove tab item
         tab.item.disconnect(tab.item_title_handler)
-        tab.item.disconnect(tab.item_title_tooltip_text_handler)
+        for handler in tab.item_icon_handlers:
+            tab.item.disconnect(handler)
         tab.item.unparent()
 
         # Remove child widgets
-        tab.image.unparent()
-        tab.image.destroy()
-        tab.label.unparent()
-        tab.label.destroy()
-        tab.button.unparent()
-        tab.button.destroy()
-        self._list_menu.remove(tab.menu_item)
-        tab.menu_item.destroy()
-        self._tabs.remove(tab)
+        if tab.image is not None:
+            self._destroy_tab_widgets(tab)
+        if tab in self._visible_tabs:
+            self._visible_tabs.remove(tab)
+        del self._tabs[item_num]
+        del self._tabs_by_age[tab]
+        del self._tab_map[child]
+        self._tab_indexes.pop(tab, None)
+        self._invalidate_indexes(item_num)
 
         # Refresh ourselves
         current_tab_index = old_tab_index
@@ -693,8 +911,21 @@ class DockGroup(gtk.Container):
         if item_num < current_tab_index:
             item_num = current_tab_index - 1
 
-        self.set_current_item(item_num)
-        self.emit('item-removed', child)
+        if not self._frozen:
+            self.set_current_item(item_num)
+            self.emit('item-removed', child)
+            return
+
+        # Keep track of the current tab, set_current_item() is called on thaw
+        if self._tabs:
+            self._current_tab = self._tabs[min(item_num, len(self._tabs) - 1)]
+        else:
+            self._current_tab = None
+
+        if child in self._frozen_added:
+            self._frozen_added.remove(child)
+        else:
+            self._frozen_removed.append(child)
 
     ############################################################################
     # EtkDockGroup
@@ -704,7 +935,109 @@ class DockGroup(gtk.Container):
     visible_items = property(lambda s: [t.item for t in s._visible_tabs])
 
     def __contains__(self, item):
-        return item in self.items
+        return item in self._tab_map
+
+    def _tab_index(self, tab):
+        '''
+        :param tab: a _DockGroupTab in the dockgroup.
+        :returns: the index of `tab` in the dockgroup.
+
+        Positions are cached, and only recomputed for the tabs after the
+        first position that changed since the last lookup.
+        '''
+        index = self._tab_indexes.get(tab)
+
+        if index is None or index >= self._indexed:
+            for index in range(self._indexed, len(self._tabs)):
+                self._tab_indexes[self._tabs[index]] = index
+
+            self._indexed = len(self._tabs)
+            index = self._tab_indexes[tab]
+
+        return index
+
+    def _invalidate_indexes(self, position):
+        '''
+        :param position: the first index at which tabs have changed.
+        '''
+        self._indexed = min(self._indexed, position)
+
+    def _get_palette(self):
+        '''
+        :returns: the palette to draw with in the current state and tab
+                  state. Palettes are computed once, until the style changes.
+        '''
+        key = (self.state, self._tab_state)
+
+        try:
+            return self._palettes[key]
+        except KeyError:
+            palette = self._palettes[key] = _make_palette(self.style, *key)
+            return palette
+
+    def _focus_tab(self, tab):
+        tab.last_focused = time()
+        self._tabs_by_age.pop(tab, None)
+        self._tabs_by_age[tab] = None
+
+    def _create_tab_widgets(self, tab):
+        '''
+        Create the composite children that make up a tab. Tabs that are never
+        shown do without, see _estimate_tab_sizes().
+        '''
+        gtk.widget_push_composite_child()
+        tab.image = tab.item.get_image()
+        tab.label = gtk.Label(tab.item.get_title())
+        tab.button = CompactButton(size=self._tab_button_size, has_frame=False, has_input_window=False)
+        gtk.widget_pop_composite_child()
+
+        tab.image.set_parent(self)
+        tab.label.set_parent(self)
+        tab.button.set_icon_name_normal('compact-close')
+        tab.button.set_icon_name_prelight('compact-close-prelight')
+        tab.button.set_parent(self)
+        tab.button.connect('clicked', self._on_tab_button_clicked, tab.item)
+
+        if self.flags() & gtk.REALIZED:
+            tab.image.set_parent_window(self.window)
+            tab.label.set_parent_window(self.window)
+            tab.button.set_parent_window(self.window)
+
+        # Replace the estimate, resize if it was off
+        sizes = tab.image.size_request() + tab.label.size_request() + tab.button.size_request()
+
+        if tab.sizes is not None and tab.sizes != sizes:
+            self.queue_resize()
+
+        tab.sizes = sizes
+
+    def _destroy_tab_widgets(self, tab):
+        '''
+        Destroy the composite children created by _create_tab_widgets(). The
+        tab keeps its sizes.
+        '''
+        if tab.button in (self._hover_button, self._pressed_button):
+            self._hover_button = self._pressed_button = None
+
+        for widget in (tab.image, tab.label, tab.button):
+            widget.unparent()
+            widget.destroy()
+
+        tab.image = tab.label = tab.button = None
+
+    def _estimate_tab_sizes(self, tab):
+        '''
+        :returns: the (image, label, button) sizes a tab without widgets would
+                  request, in the form of the _DockGroupTab.sizes slot.
+        '''
+        if tab.item.get_icon_name() or tab.item.get_stock():
+            (iw, ih) = gtk.icon_size_lookup(gtk.ICON_SIZE_MENU)
+        else:
+            iw = ih = 0
+
+        (lw, lh) = self.create_pango_layout(tab.item.get_title()).get_pixel_size()
+
+        return (iw, ih, lw, lh, self._tab_button_size, self._tab_button_size)
 
     def _update_visible_tabs(self):
         # Check what tabs we can show with the space we have been allocated.
@@ -713,45 +1046,62 @@ class DockGroup(gtk.Container):
         if not self._tabs:
             del self._visible_tabs[:]
         else:
-            # TODO: get previous tab position, use that to insert _current_tab
-            if self._current_tab and self._current_tab not in self._visible_tabs:
-                self._visible_tabs.append(self._current_tab)
-
-            # if not set(self._visible_tabs) <= set(self._tabs):
-            for tab in self._visible_tabs:
-                if tab not in self._tabs:
-                    self._visible_tabs.remove(tab)
+            tabs = self._tabs_by_age
+            visible = [tab for tab in self._visible_tabs if tab in tabs]
+            shown = set(visible)
 
-                # TODO: There are other places where something like this happens,
-                #       notably do_motion_notify_event. Consider some cleanup...
-                if tab is self._current_tab:
-                    tab.button.show()
-                else:
-                    tab.button.hide()
+            # TODO: get previous tab position, use that to insert _current_tab
+            if self._current_tab and self._current_tab not in shown:
+                visible.append(self._current_tab)
+                shown.add(self._current_tab)
 
             available_width = self._available_width
             calculated_width = 0
 
-            for tab in self._visible_tabs:
+            for tab in visible:
                 calculated_width += tab.area.width
 
-            if calculated_width < available_width and len(self._visible_tabs) < len(self._tabs):
-                tab_age = sorted(self._tabs, key=attrgetter('last_focused'), reverse=True)
+            # Show the most recently focused hidden tabs while there's room. As
+            # the visible tabs tend to be the most recent ones, this only walks
+            # past the visible tabs and the tabs that are added.
+            if calculated_width < available_width and len(visible) < len(self._tabs):
+                for tab in reversed(tabs):
+                    if calculated_width >= available_width:
+                        break
+
+                    if tab not in shown:
+                        calculated_width += tab.area.width
+                        visible.append(tab)
+                        shown.add(tab)
+
+            # Hide the least recently focused tabs until the rest fits, but
+            # always keep the current tab
+            if calculated_width > available_width:
+                hidden = set()
+                others = [tab for tab in visible if tab is not self._current_tab]
+
+                for tab in sorted(others, key=attrgetter('last_focused')):
+                    if calculated_width <= available_width:
+                        break
 
-                while tab_age and calculated_width < available_width:
-                    if tab_age[0] not in self._visible_tabs:
-                        calculated_width += tab_age[0].area.width
-                        self._visible_tabs.append(tab_age[0])
+                    calculated_width -= tab.area.width
+                    hidden.add(tab)
 
-                    del tab_age[0]
+                visible = [tab for tab in visible if tab not in hidden]
 
-            if calculated_width > available_width:
-                tab_age = sorted(self._visible_tabs, key=attrgetter('last_focused'))
+            self._visible_tabs[:] = visible
 
-                while len(tab_age) > 1 and calculated_width > available_width:
-                    calculated_width -= tab_age[0].area.width
-                    self._visible_tabs.remove(tab_age[0])
-                    del tab_age[0]
+            for tab in visible:
+                # Tab widgets are only created once a tab is shown
+                if tab.image is None:
+                    self._create_tab_widgets(tab)
+
+                # TODO: There are other places where something like this happens,
+                #       notably do_motion_notify_event. Consider some cleanup...
+                if tab is self._current_tab:
+                    tab.button.show()
+                else:
+                    tab.button.hide()
 
             # If the current item's tab is the only visible tab,
             # we need to recalculate its tab.area.width
@@ -847,53 +1197,115 @@ class DockGroup(gtk.Container):
         if position is None or position < 0:
             position = len(self)
 
-        # Create composite children for tab
-        gtk.widget_push_composite_child()
+        # The composite children for the tab are created when it is shown,
+        # see _create_tab_widgets()
         tab = _DockGroupTab()
-        tab.image = item.get_image()
-        tab.label = gtk.Label()
-        tab.button = CompactButton(has_frame=False)
-        tab.menu_item = gtk.ImageMenuItem()
-        gtk.widget_pop_composite_child()
-
-        # Configure child widgets for tab
+        tab.image = tab.label = tab.button = None
         tab.item = item
         tab.item.set_parent(self)
         tab.item_title_handler = tab.item.connect('notify::title', self._on_item_title_changed, tab)
-        tab.item_title_tooltip_text_handler = tab.item.connect('notify::title-tooltip-text',
-                                                               self._on_item_title_tooltip_text_changed, tab)
-        tab.image.set_parent(self)
-        tab.label.set_text(item.get_title())
-        tab.label.set_parent(self)
-        tab.button.set_icon_name_normal('compact-close')
-        tab.button.set_icon_name_prelight('compact-close-prelight')
-        tab.button.set_parent(self)
-        tab.button.connect('clicked', self._on_tab_button_clicked, item)
-        tab.menu_item.set_image(item.get_image())
-        tab.menu_item.set_label(item.get_title())
-        tab.menu_item.connect('activate', self._on_list_menu_item_activated, tab)
-        self._list_menu.append(tab.menu_item)
+        tab.item_icon_handlers = (tab.item.connect('notify::icon-name', self._on_item_icon_changed, tab),
+                                  tab.item.connect('notify::stock', self._on_item_icon_changed, tab))
         tab.area = gdk.Rectangle()
-        tab.last_focused = time()
+        tab.sizes = None
+        self._focus_tab(tab)
 
         if self.flags() & gtk.REALIZED:
             tab.item.set_parent_window(self.window)
-            tab.image.set_parent_window(self.window)
-            tab.label.set_parent_window(self.window)
-            tab.button.set_parent_window(self.window)
 
         self._tabs.insert(position, tab)
-        self.emit('item-added', item)
+        self._tab_map[item] = tab
+        self._invalidate_indexes(position)
+
+        if not self._frozen:
+            self.emit('item-added', item)
 
         # TODO: get rid of this pronto!
         if visible_position is not None:
+            self._create_tab_widgets(tab)
             self._visible_tabs.insert(visible_position, tab)
 
         item_num = self.item_num(item)
-        self.set_current_item(item_num)
+
+        if self._frozen:
+            self._current_tab = tab
+            self._frozen_added.append(item)
+        else:
+            self.set_current_item(item_num)
 
         return item_num
 
+    def insert_items(self, items, position=None):
+        '''
+        :param items: a sequence of DockItem
+        :param position: the index (starting at 0) at which to insert the first
+                         item, or None to append the items after all other
+                         item tabs.
+
+        The insert_items() method inserts several DockItems into the DockGroup
+        at once, in the order given. The last inserted item becomes the current
+        item. The DockGroup is resized once and emits a single items-changed
+        signal instead of an item-added signal per item.
+        '''
+        if position is None or position < 0:
+            position = len(self)
+
+        with self.freeze_layout():
+            for offset, item in enumerate(items):
+                self._insert_item(item, position + offset)
+
+    def remove_items(self, items):
+        '''
+        :param items: a sequence of DockItem in the DockGroup
+
+        The remove_items() method removes several DockItems from the DockGroup
+        at once. The DockGroup is resized once and emits a single items-changed
+        signal instead of an item-removed signal per item.
+        '''
+        with self.freeze_layout():
+            for item in items:
+                self._remove_item(item)
+
+    def freeze_layout(self):
+        '''
+        :returns: a context manager that calls thaw_layout() on exit.
+
+        The freeze_layout() method postpones the item-added, item-removed and
+        item-selected signals and resizing the DockGroup until thaw_layout() has
+        been called as many times as freeze_layout(). The items added and
+        removed in the meantime are then reported by a single items-changed
+        signal.
+        '''
+        if not self._frozen:
+            self._frozen_tab = self._current_tab
+
+        self._frozen += 1
+        return LayoutFreeze(self)
+
+    def thaw_layout(self):
+        '''
+        The thaw_layout() method reverts the effect of a previous call to
+        freeze_layout().
+        '''
+        assert self._frozen > 0
+        self._frozen -= 1
+
+        if self._frozen:
+            return
+
+        added, self._frozen_added = self._frozen_added, []
+        removed, self._frozen_removed = self._frozen_removed, []
+        frozen_tab, self._frozen_tab = self._frozen_tab, None
+
+        if not (added or removed):
+            return
+
+        # Let set_current_item() refresh the tab that was current before
+        current_item = self.get_current_item()
+        self._current_tab = frozen_tab
+        self.set_current_item(current_item)
+        self.emit('items-changed', added, removed)
+
     def remove_item(self, item_num):
         '''
         :param item_num: the index of an item tab, starting from 0. If None,
@@ -919,10 +1331,12 @@ class DockGroup(gtk.Container):
         The item_num() method returns the index of the item tab which contains
         the DockItem specified by item or None if no item tab contains item.
         '''
-        for tab in self._tabs:
-            if tab.item is item:
-                return self._tabs.index(tab)
-        return None
+        tab = self._tab_map.get(item)
+
+        if tab is None:
+            return None
+
+        return self._tab_index(tab)
 
     def get_n_items(self):
         '''
@@ -957,7 +1371,7 @@ class DockGroup(gtk.Container):
         numbered from 0, or None if there are no item tabs.
         '''
         if self._current_tab:
-            return self._tabs.index(self._current_tab)
+            return self._tab_index(self._current_tab)
         else:
             return None
 
@@ -972,12 +1386,6 @@ class DockGroup(gtk.Container):
         negative the first item is selected. If greater than the number of
         items in the DockGroup, the last item is selected.
         '''
-        # Store a reference to the old current tab
-        if self._current_tab and self._current_tab in self._tabs:
-            old_tab = self._current_tab
-        else:
-            old_tab = None
-
         # Switch to the new current tab
         if self._tabs:
             if item_num < 0:
@@ -988,19 +1396,23 @@ class DockGroup(gtk.Container):
                 current_tab_index = item_num
 
             self._current_tab = self._tabs[current_tab_index]
-            self._current_tab.last_focused = time()
-            # Update properties on new current tab
-            self._item_title_changed(self._current_tab)
-            self._on_item_title_tooltip_text_changed(self._current_tab)
+            self._focus_tab(self._current_tab)
+
+            try:
+                self._current_tab.item.materialize()
+            except Exception:
+                # The item stays empty until it is selected again
+                self.log.error('Unable to construct the contents of item %s' %
+                               self._current_tab.item.get_title(), exc_info=True)
+
+            # The current tab is always shown
+            if self._current_tab.image is None:
+                self._create_tab_widgets(self._current_tab)
+
             self.emit('item-selected', self._current_tab.item)
         else:
             self._current_tab = None
 
-        # Update properties on old current tab
-        if old_tab:
-            self._item_title_changed(old_tab)
-            self._on_item_title_tooltip_text_changed(old_tab)
-
         # Refresh ourselves
         self.queue_resize()
 
@@ -1042,29 +1454,36 @@ class DockGroup(gtk.Container):
         elif position > len(self) - 1:
             position = len(self)
 
-        tab = self._tabs[self.item_num(item)]
-        self._tabs.remove(tab)
+        item_num = self.item_num(item)
+        tab = self._tabs.pop(item_num)
         self._tabs.insert(position, tab)
+        self._invalidate_indexes(min(item_num, position))
+        self.emit('item-reordered', item)
 
     ############################################################################
     # Property notification signal handlers
     ############################################################################
     def _item_title_changed(self, tab):
-        tab.label.set_text(tab.item.get_title())
-        self.queue_resize()
+        if tab.label is not None:
+            tab.label.set_text(tab.item.get_title())
 
-        if tab is self._current_tab:
-            tab.menu_item.child.set_use_markup(True)
-            tab.menu_item.child.set_markup('<b>%s</b>' % tab.item.get_title())
-        else:
-            tab.menu_item.child.set_use_markup(False)
-            tab.menu_item.child.set_markup(tab.item.get_title())
+        tab.sizes = None
+        self.queue_resize()
 
     def _on_item_title_changed(self, item, pspec, tab):
         self._item_title_changed(tab)
 
-    def _on_item_title_tooltip_text_changed(self, tab):
-        tab.menu_item.set_tooltip_text(tab.item.get_title_tooltip_text())
+    def _on_item_icon_changed(self, item, pspec, tab):
+        if tab.image is not None:
+            if item.get_icon_name():
+                tab.image.set_from_icon_name(item.get_icon_name(), gtk.ICON_SIZE_MENU)
+            elif item.get_stock():
+                tab.image.set_from_stock(item.get_stock(), gtk.ICON_SIZE_MENU)
+            else:
+                tab.image.clear()
+
+        tab.sizes = None
+        self.queue_resize()
 
     ############################################################################
     # Decoration area signal handlers
@@ -1079,13 +1498,87 @@ class DockGroup(gtk.Container):
             y = wy + button.allocation.y + button.allocation.height
             return (x, y, True)
 
-        self._list_menu.show_all()
+        if not self._list_menu:
+            self._list_menu = gtk.Menu()
+            self._list_menu.attach_to_widget(self._list_button, None)
+            self._list_menu.connect('key-press-event', self._on_list_menu_key_press_event)
+            self._list_menu.connect('selection-done', self._on_list_menu_selection_done)
+
+        self._list_model = [(_search_key(tab.item.get_title()), tab) for tab in self._tabs]
+        self._list_filter = ''
+        self._fill_list_menu()
         self._list_menu.popup(parent_menu_shell=None, parent_menu_item=None,
                               func=_menu_position, button=1,
                               activate_time=0)
 
+    def _fill_list_menu(self):
+        '''
+        (Re)build the list menu items for the tabs whose title contains the
+        typed filter text, showing no more than _list_menu_rows of them.
+        '''
+        for menu_item in self._list_menu.get_children():
+            menu_item.destroy()
+
+        key = _search_key(self._list_filter)
+        tabs = [tab for (title, tab) in self._list_model if key in title]
+
+        if self._list_filter:
+            menu_item = gtk.MenuItem(self._list_filter, use_underline=False)
+            menu_item.set_sensitive(False)
+            self._list_menu.append(menu_item)
+
+        for tab in tabs[:self._list_menu_rows]:
+            menu_item = gtk.ImageMenuItem()
+            menu_item.set_image(tab.item.get_image())
+            menu_item.set_label(tab.item.get_title())
+            menu_item.set_tooltip_text(tab.item.get_title_tooltip_text())
+            menu_item.connect('activate', self._on_list_menu_item_activated, tab)
+
+            if tab is self._current_tab:
+                menu_item.child.set_use_markup(True)
+                menu_item.child.set_markup('<b>%s</b>' % tab.item.get_title())
+
+            self._list_menu.append(menu_item)
+
+        if len(tabs) > self._list_menu_rows:
+            menu_item = gtk.MenuItem(_('%d more, type to filter') % (len(tabs) - self._list_menu_rows),
+                                     use_underline=False)
+            menu_item.set_sensitive(False)
+            self._list_menu.append(menu_item)
+
+        self._list_menu.show_all()
+
+    def _on_list_menu_key_press_event(self, menu, event):
+        if gdk.keyval_name(event.keyval) == 'BackSpace':
+            if not self._list_filter:
+                return False
+
+            self._list_filter = self._list_filter[:-1]
+        else:
+            char = gdk.keyval_to_unicode(event.keyval)
+
+            # Leave control characters and shortcuts to the menu
+            if char < 0x20 or char == 0x7f or event.state & (gdk.CONTROL_MASK | gdk.MOD1_MASK):
+                return False
+
+            self._list_filter += chr(char)
+
+        self._fill_list_menu()
+        menu.reposition()
+        return True
+
+    def _on_list_menu_selection_done(self, menu):
+        # Drop the menu items, they are created again on the next popup
+        for menu_item in menu.get_children():
+            menu_item.destroy()
+
+        self._list_model = []
+        self._list_filter = ''
+
     def _on_list_menu_item_activated(self, menuitem, tab):
-        self.set_current_item(self._tabs.index(tab))
+        # The tab may have been removed while the menu was shown
+        if tab in self._tabs_by_age:
+            self.set_current_item(self._tab_index(tab))
 
     def _on_min_button_clicked(self, button):
         # TODO: Hiding the dockgroup is not a good idea, as it will be 'minimized'
@@ -74,6 +74,7 @@ class DockItem(gtk.Bin):
         # Internal housekeeping
         self._icon_name = icon_name
         self._stock_id = stock_id
+        self._child_factory = None
 
         self.set_title(title)
         self.set_title_tooltip_text(title_tooltip_text)
@@ -179,3 +180,30 @@ class DockItem(gtk.Bin):
 
     def close(self):
         self.emit('close')
+
+    def get_child_factory(self):
+        return self._child_factory
+
+    def set_child_factory(self, factory):
+        '''
+        :param factory: a callable returning the child widget, or None.
+
+        Defer construction of the child widget. The factory is called by
+        :meth:`materialize`, the first time the item becomes the current item
+        of a DockGroup.
+        '''
+        self._child_factory = factory
+
+    def materialize(self):
+        '''
+        Construct and add the child widget set with :meth:`set_child_factory`,
+        unless that has been done already. If the factory raises an exception,
+        the next call tries again.
+        '''
+        factory = self._child_factory
+
+        if factory:
+            child = factory()
+            self._child_factory = None
+            self.add(child)
+            child.show_all()
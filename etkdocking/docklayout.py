@@ -84,6 +84,7 @@ class DockLayout(gobject.GObject):
         self._focused_item = None
         self._focused_group = None
         self._focus_data = WeakKeyDictionary()  # Map item -> last focused widget
+        self._dirty = WeakKeyDictionary()  # Map widget -> True, changed since last save
 
         self._drag_data = None
 
@@ -120,19 +121,55 @@ class DockLayout(gobject.GObject):
         return [w for w in itertools.chain.from_iterable(flatten(frame) for frame in self.frames) if
                 w.get_name() == name]
 
+    def mark_dirty(self, widget):
+        """
+        Record that the serialized form of `widget` changed. As a widget is
+        serialized as part of its parent, all ancestors are marked as well.
+        """
+        while widget:
+            self._dirty[widget] = True
+            widget = widget.get_parent()
+
+    def mark_clean(self, widget):
+        """
+        Record that `widget` has been serialized in its current state.
+        """
+        self._dirty.pop(widget, None)
+
+    def is_dirty(self, widget):
+        """
+        Check if `widget` changed since it was last marked clean. Widgets that
+        have never been marked dirty are considered clean.
+        """
+        return widget in self._dirty
+
     def _get_signals(self, widget):
         """
         Get a list of signals to be registered for a specific widget.
         """
         if isinstance(widget, DockPaned):
             signals = (('item-added', self.on_widget_add),
-                       ('item-removed', self.on_widget_remove))
+                       ('item-removed', self.on_widget_remove),
+                       ('item-reordered', self.on_widget_reordered),
+                       ('items-changed', self.on_widget_items_changed),
+                       ('notify::orientation', self.on_widget_changed),
+                       ('child-notify::weight', self.on_widget_changed))
         elif isinstance(widget, DockGroup):
             signals = (('item-added', self.on_widget_add),
                        ('item-removed', self.on_widget_remove),
-                       ('item-selected', self.on_dockgroup_item_selected))
+                       ('item-reordered', self.on_widget_reordered),
+                       ('items-changed', self.on_widget_items_changed),
+                       ('item-selected', self.on_dockgroup_item_selected),
+                       ('notify::name', self.on_widget_changed),
+                       ('child-notify::weight', self.on_widget_changed))
         elif isinstance(widget, DockItem):
-            signals = (('close', self.on_dockitem_close),)
+            signals = (('add', self.on_widget_add),
+                       ('remove', self.on_widget_remove),
+                       ('close', self.on_dockitem_close),
+                       ('notify::title', self.on_widget_changed),
+                       ('notify::title-tooltip-text', self.on_widget_changed),
+                       ('notify::icon-name', self.on_widget_changed),
+                       ('notify::stock', self.on_widget_changed))
         elif isinstance(widget, gtk.Container):
             signals = (('add', self.on_widget_add),
                        ('remove', self.on_widget_remove))
@@ -232,6 +269,7 @@ class DockLayout(gobject.GObject):
         if isinstance(widget, gtk.Container):
             self.add_signal_handlers(widget)
 
+        self.mark_dirty(widget)
         self.update_floating_window_title(container)
 
     def on_widget_remove(self, container, widget):
@@ -241,8 +279,41 @@ class DockLayout(gobject.GObject):
         if isinstance(widget, gtk.Container):
             self.remove_signal_handlers(widget)
 
+        self.mark_dirty(container)
         self.update_floating_window_title(container)
 
+    def on_widget_reordered(self, container, widget):
+        """
+        The order of the items in a container changed.
+        """
+        self.mark_dirty(container)
+
+    def on_widget_items_changed(self, container, added, removed):
+        """
+        Batched version of on_widget_add() and on_widget_remove(), for
+        containers that were changed while their layout was frozen.
+        """
+        for widget in removed:
+            if isinstance(widget, gtk.Container):
+                self.remove_signal_handlers(widget)
+
+        for widget in added:
+            if isinstance(widget, gtk.Container):
+                self.add_signal_handlers(widget)
+
+            self.mark_dirty(widget)
+
+        if removed:
+            self.mark_dirty(container)
+
+        self.update_floating_window_title(container)
+
+    def on_widget_changed(self, widget, pspec):
+        """
+        A (child) property that ends up in the serialized layout changed.
+        """
+        self.mark_dirty(widget)
+
     def on_widget_drag_motion(self, widget, context, x, y, timestamp):
         if DRAG_TARGET_ITEM_LIST[0] in context.targets:
             context.docklayout = self
@@ -748,13 +819,8 @@ def dock_paned_highlight(self):
 def dock_paned_drag_motion(self, context, x, y, timestamp):
     self.log.debug('dock_paned_drag_motion: %s, %s, %s, %s' % (context, x, y, timestamp))
 
-    handle = self._get_handle_at_pos(x, y)
-    self.log.debug('handle at pos (%d, %d) is %s', x, y, handle)
-
-    if handle:
-        self._drop_handle_index = self._handles.index(handle)
-    else:
-        self._drop_handle_index = None
+    self._drop_handle_index = self._get_handle_index_at_pos(x, y)
+    self.log.debug('handle at pos (%d, %d) is %s', x, y, self._drop_handle_index)
 
     dock_paned_highlight(self)
 
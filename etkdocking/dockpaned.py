@@ -26,6 +26,7 @@ from builtins import range
 from builtins import hex
 from builtins import zip
 from past.utils import old_div
+from bisect import bisect_left
 from logging import getLogger
 
 import gobject
@@ -33,7 +34,7 @@ import gtk
 import gtk.gdk as gdk
 
 from .dnd import DockDragContext
-from .util import rect_overlaps
+from .util import rect_overlaps, LayoutFreeze
 from .docksettings import settings
 
 # The weight we allocate to a newly added item if we can't come up with anything else
@@ -60,13 +61,15 @@ class _DockPanedItem(object):
     __slots__ = ['child',  # child widget
                  'weight',  # relative weight [0..1]
                  'weight_request',  # requested weight, processed in size_allocate()
-                 'min_size']  # minimum relative weight
+                 'min_size',  # minimum relative weight
+                 'area']  # allocation handed to the child (gdk.Rectangle)
 
     def __init__(self):
         self.child = None
         self.weight = None
         self.weight_request = None
         self.min_size = None
+        self.area = gdk.Rectangle()
 
     def __contains__(self, pos):
         return rect_overlaps(self.child.allocation, *pos)
@@ -118,7 +121,15 @@ class DockPaned(gtk.Container):
                     'item-removed':
                         (gobject.SIGNAL_RUN_LAST,
                          gobject.TYPE_NONE,
-                         (gobject.TYPE_OBJECT,))}
+                         (gobject.TYPE_OBJECT,)),
+                    'item-reordered':
+                        (gobject.SIGNAL_RUN_LAST,
+                         gobject.TYPE_NONE,
+                         (gobject.TYPE_OBJECT,)),
+                    'items-changed':
+                        (gobject.SIGNAL_RUN_LAST,
+                         gobject.TYPE_NONE,
+                         (gobject.TYPE_PYOBJECT, gobject.TYPE_PYOBJECT))}
 
     def __init__(self):
         gtk.Container.__init__(self)
@@ -128,12 +139,22 @@ class DockPaned(gtk.Container):
 
         # Initialize attributes
         self._items = []
+        self._item_map = {}  # Map child -> _DockPanedItem
+        self._item_indexes = {}  # Map _DockPanedItem -> index in _items
+        self._indexed = 0  # _item_indexes is valid for _items[:_indexed]
         self._handles = []
+        self._handle_ends = []  # Handle end positions, built in do_size_allocate()
+        self._allocation_key = None  # Layout inputs of the last allocation
+        self._frozen = 0  # Nesting depth of freeze_layout()
+        self._frozen_added = []  # Children added while frozen
+        self._frozen_removed = []  # Children removed while frozen
         self._hcursor = None
         self._vcursor = None
 
         # Initialize handle dragging (not to be confused with DnD...)
         self._dragcontext = DockDragContext()
+        self._drag_position = None  # Latest pointer position of a handle drag
+        self._drag_source_id = None  # Idle callback applying the handle drag
 
         # Initialize properties
         self.set_handle_size(4)
@@ -142,27 +163,6 @@ class DockPaned(gtk.Container):
     ############################################################################
     # Private
     ############################################################################
-    def _children(self):
-        '''
-        :returns: an iterator that returns the items and handles in the dockpaned.
-
-        The :meth:`_children` method returns an iterator that returns the items
-        and handles in the dockpaned in the order they are drawn. This
-        corresponds to ``[_items[0], _handles[0], _items[1], _handles[1],
-        _items[2], ...]``
-        '''
-        index = 0
-        switch = True
-
-        for x in range(len(self._items) + len(self._handles)):
-            if switch:
-                yield self._items[index]
-                switch = False
-            else:
-                yield self._handles[index]
-                switch = True
-                index += 1
-
     def _insert_item(self, child, position=None, weight=None):
         '''
         :param child: a :class:`gtk.Widget` to use as the contents of the item.
@@ -177,7 +177,7 @@ class DockPaned(gtk.Container):
         :meth:`prepend_item` methods.
         '''
         assert isinstance(child, gtk.Widget)
-        assert self.item_num(child) is None
+        assert child not in self._item_map
         assert not child.get_parent()
 
         if position is None or position < 0:
@@ -192,6 +192,8 @@ class DockPaned(gtk.Container):
             item.child.set_parent_window(self.window)
 
         self._items.insert(position, item)
+        self._item_map[child] = item
+        self._invalidate_indexes(position)
 
         # Create a _DockPanedHandle if needed
         if len(self) > 1:
@@ -219,8 +221,12 @@ class DockPaned(gtk.Container):
         else:
             item.weight_request = FALLBACK_WEIGHT
 
-        self.queue_resize()
-        self.emit('item-added', child)
+        if self._frozen:
+            self._frozen_added.append(child)
+        else:
+            self.queue_resize()
+            self.emit('item-added', child)
+
         return self.item_num(child)
 
     def _remove_item(self, child):
@@ -235,7 +241,10 @@ class DockPaned(gtk.Container):
 
         # Remove the DockPanedItem from the list
         child.unparent()
-        del self._items[item_num]
+        item = self._items.pop(item_num)
+        del self._item_map[child]
+        self._item_indexes.pop(item, None)
+        self._invalidate_indexes(item_num)
 
         # If there are still items/handles in the list, we'd like to
         # remove a handle...
@@ -245,8 +254,13 @@ class DockPaned(gtk.Container):
         assert len(self._items) == len(self._handles) + 1 or \
                len(self._items) == len(self._handles) == 0
 
-        self.queue_resize()
-        self.emit('item-removed', child)
+        if not self._frozen:
+            self.queue_resize()
+            self.emit('item-removed', child)
+        elif child in self._frozen_added:
+            self._frozen_added.remove(child)
+        else:
+            self._frozen_removed.append(child)
 
     def _insert_handle(self, position):
         '''
@@ -257,6 +271,7 @@ class DockPaned(gtk.Container):
         '''
         handle = _DockPanedHandle()
         self._handles.insert(position, handle)
+        self._handle_ends = []
 
     def _remove_handle(self, position):
         '''
@@ -275,6 +290,8 @@ class DockPaned(gtk.Container):
             # be located before the DockPanedItem we just removed
             del self._handles[position - 1]
 
+        self._handle_ends = []
+
     def _get_n_handles(self):
         '''
         :returns: the number of handles in the dockpaned.
@@ -294,17 +311,70 @@ class DockPaned(gtk.Container):
         contains the position specified by `x` and `y` or :const:`None` if no
         handle is at that position.
         '''
-        for handle in self._handles:
-            if (x, y) in handle:
-                return handle
+        index = self._get_handle_index_at_pos(x, y)
+
+        if index is not None:
+            return self._handles[index]
+        else:
+            return None
+
+    def _get_handle_index_at_pos(self, x, y):
+        '''
+        :param x: the x coordinate of the position.
+        :param y: the y coordinate of the position.
+        :returns: the index of the handle at the position specified by x and y
+                  or :const:`None`.
+
+        Handles are laid out in order along the orientation axis, so the handle
+        is found with a binary search over the handle end positions recorded
+        by :meth:`do_size_allocate`.
+        '''
+        handle_ends = self._handle_ends
+
+        if len(handle_ends) != len(self._handles):
+            # Not allocated since handles were added or removed
+            return None
+
+        if self._orientation == gtk.ORIENTATION_HORIZONTAL:
+            index = bisect_left(handle_ends, x)
+        else:
+            index = bisect_left(handle_ends, y)
+
+        if index < len(handle_ends) and rect_overlaps(self._handles[index].area, x, y):
+            return index
         else:
             return None
 
     def _item_for_child(self, child):
-        for item in self._items:
-            if item.child is child:
-                return item
-        raise ValueError('child widget %s not in paned' % child)
+        try:
+            return self._item_map[child]
+        except KeyError:
+            raise ValueError('child widget %s not in paned' % child)
+
+    def _item_index(self, item):
+        '''
+        :param item: a _DockPanedItem in the dockpaned.
+        :returns: the index of `item` in the dockpaned.
+
+        Positions are cached, and only recomputed for the items after the
+        first position that changed since the last lookup.
+        '''
+        index = self._item_indexes.get(item)
+
+        if index is None or index >= self._indexed:
+            for index in range(self._indexed, len(self._items)):
+                self._item_indexes[self._items[index]] = index
+
+            self._indexed = len(self._items)
+            index = self._item_indexes[item]
+
+        return index
+
+    def _invalidate_indexes(self, position):
+        '''
+        :param position: the first index at which items have changed.
+        '''
+        self._indexed = min(self._indexed, position)
 
     def _size(self, allocation):
         '''
@@ -387,12 +457,20 @@ class DockPaned(gtk.Container):
                 if i.weight and not settings[i.child].expand and not i.weight_request:
                     i.weight_request = i.weight * f
 
-        requested_items = [i for i in items if i.weight_request]
-        other_items = [i for i in items if not i.weight_request]
+        requested_items = []
+        other_items = []
+        requested_weight = 0
+        min_size = 0
 
-        # Ensure the min_sizes do not exceed the overall size
-        min_size = sum(i.min_size for i in items)
+        for i in items:
+            if i.weight_request:
+                requested_items.append(i)
+                requested_weight += i.weight_request
+            else:
+                other_items.append(i)
+            min_size += i.min_size
 
+        # Ensure the min_sizes do not exceed the overall size
         if min_size > size:
             sf = old_div(size, min_size)
             self.log.warn('Size scaling required (factor=%f)' % sf)
@@ -401,17 +479,27 @@ class DockPaned(gtk.Container):
 
         # First ensure all remaining items can be placed
         for i, w in zip(other_items,
-                        fair_scale(1.0 - sum(i.weight_request for i in requested_items), \
+                        fair_scale(1.0 - requested_weight, \
                                    [(i.weight, sf * i.min_size / size) for i in other_items])):
-            i.weight = w
+            self._set_weight(i, w)
 
         # Divide what's left over the requesting items
         for i, w in zip(requested_items,
                         fair_scale(1.0 - sum(i.weight for i in other_items), \
                                    [(i.weight_request, sf * i.min_size / size) for i in requested_items])):
-            i.weight = w
+            self._set_weight(i, w)
             i.weight_request = None
 
+    def _set_weight(self, item, weight):
+        '''
+        Assign a newly computed weight to `item`. Interested parties (like
+        DockLayout, that keeps track of changes to the layout) are notified
+        through the weight child property, but only if the weight changed.
+        '''
+        if item.weight != weight:
+            item.weight = weight
+            item.child.child_notify('weight')
+
     ############################################################################
 
     def __getitem__(self, index):
@@ -425,10 +513,7 @@ class DockPaned(gtk.Container):
         return len(self._items)
 
     def __contains__(self, child):
-        for i in self._items:
-            if i.child is child:
-                return True
-        return False
+        return child in self._item_map
 
     def __iter__(self):
         for i in self._items:
@@ -480,6 +565,7 @@ class DockPaned(gtk.Container):
         self._vcursor = gdk.Cursor(self.get_display(), gdk.SB_V_DOUBLE_ARROW)
 
     def do_unrealize(self):
+        self._cancel_handle_drag()
         self._hcursor = None
         self._vcursor = None
         self.window.set_user_data(None)
@@ -538,51 +624,59 @@ class DockPaned(gtk.Container):
         #
         ####################################################################
 
-        if self._items:
+        key = self._get_allocation_key(allocation)
+
+        if key == self._allocation_key:
+            # Nothing that affects the layout changed: hand out the same
+            # allocations, children that queued a resize get their turn.
+            for item in self._items:
+                item.child.size_allocate(item.area)
+        elif self._items:
             size = self._effective_size(allocation)
 
             self._redistribute_weight(size)
 
-            cx = cy = 0  # current x and y counters
+            # Allocate items and handles in turn, reusing their rectangles.
+            # GTK+ itself skips children whose allocation did not change.
+            horizontal = self._orientation == gtk.ORIENTATION_HORIZONTAL
             handle_size = self._handle_size
+            handle_ends = []
+            handles = self._handles
+            last = len(self._items) - 1
+            pos = 0  # current position along the orientation axis
 
-            # Allocate child widgets: both items and handles, so we can simply increment
-            for child in self._children():
-                rect = gdk.Rectangle()
-                rect.x = cx
-                rect.y = cy
-
-                if isinstance(child, _DockPanedItem):
-                    s = round(child.weight * size)
+            for index, item in enumerate(self._items):
+                rect = item.area
 
-                    if self._orientation == gtk.ORIENTATION_HORIZONTAL:
-                        rect.height = allocation.height
-                        rect.width = s
-                        cx += s
+                if index == last:
+                    # The last item takes whatever space is left
+                    s = (allocation.width if horizontal else allocation.height) - pos
+                else:
+                    s = int(round(item.weight * size))
 
-                        if child is self._items[-1]:
-                            rect.width += allocation.width - cx
-                    else:
-                        rect.height = s
-                        rect.width = allocation.width
-                        cy += s
+                if horizontal:
+                    rect.x, rect.y, rect.width, rect.height = pos, 0, s, allocation.height
+                else:
+                    rect.x, rect.y, rect.width, rect.height = 0, pos, allocation.width, s
 
-                        if child is self._items[-1]:
-                            rect.height += allocation.height - cy
+                item.child.size_allocate(rect)
+                pos += s
 
-                    child.child.size_allocate(rect)
+                if index < last:
+                    area = handles[index].area
 
-                elif isinstance(child, _DockPanedHandle):
-                    if self._orientation == gtk.ORIENTATION_HORIZONTAL:
-                        rect.height = allocation.height
-                        rect.width = handle_size
-                        cx += handle_size
+                    if horizontal:
+                        area.x, area.y, area.width, area.height = pos, 0, handle_size, allocation.height
                     else:
-                        rect.height = handle_size
-                        rect.width = allocation.width
-                        cy += handle_size
+                        area.x, area.y, area.width, area.height = 0, pos, allocation.width, handle_size
+
+                    pos += handle_size
+                    handle_ends.append(pos)
 
-                    child.area = rect
+            self._handle_ends = handle_ends
+            key = self._get_allocation_key(allocation)
+
+        self._allocation_key = key
 
         # Accept new allocation
         self.allocation = allocation
@@ -626,6 +720,10 @@ class DockPaned(gtk.Container):
     def do_button_release_event(self, event):
         # Reset drag context
         if event.button == self._dragcontext.source_button:
+            # Apply the last position the handle was dragged to
+            if self._drag_source_id:
+                self._apply_handle_drag()
+            self._cancel_handle_drag()
             self._dragcontext.reset()
             self.window.set_cursor(None)
             return True
@@ -642,43 +740,72 @@ class DockPaned(gtk.Container):
             else:
                 cursor = self._vcursor
 
-        # Drag a handle
+        # Drag a handle. Motion events can come in much faster than we can
+        # resize, so only the latest position is applied, once per main loop
+        # iteration, before GTK+ processes the resize.
         if self._dragcontext.dragging:
             if self._orientation == gtk.ORIENTATION_HORIZONTAL:
                 cursor = self._hcursor
-                delta_size = int(event.x -
-                                 self._dragcontext.dragged_object.area.x -
-                                 self._dragcontext.offset_x)
+                self._drag_position = event.x
             else:
                 cursor = self._vcursor
-                delta_size = int(event.y -
-                                 self._dragcontext.dragged_object.area.y -
-                                 self._dragcontext.offset_y)
-
-            handle_index = self._handles.index(self._dragcontext.dragged_object)
-            item_after = self._items[handle_index + 1]
-
-            if delta_size < 0:
-                # Enlarge the item after and shrink the items before the handle
-                delta_size = abs(delta_size)
-                enlarge = item_after
-                shrink = reversed(self._items[:self._items.index(item_after)])
-                self._redistribute_size(delta_size, enlarge, shrink)
-            elif delta_size > 0:
-                # Enlarge the item before and shrink the items after the handle
-                enlarge = self._items[handle_index]
-                shrink = self._items[self._items.index(item_after):]
-                self._redistribute_size(delta_size, enlarge, shrink)
-            else:
-                enlarge = None
-                shrink = []
+                self._drag_position = event.y
 
-            self.queue_resize()
+            if not self._drag_source_id:
+                self._drag_source_id = gobject.idle_add(self._on_handle_drag_idle,
+                                                        priority=gobject.PRIORITY_HIGH_IDLE)
 
         # Set the cursor we decided upon above...
         if cursor:
             self.window.set_cursor(cursor)
 
+    def _on_handle_drag_idle(self):
+        self._drag_source_id = None
+        self._apply_handle_drag()
+        return False
+
+    def _apply_handle_drag(self):
+        '''
+        Resize the items around the dragged handle, so the handle ends up at
+        the latest pointer position.
+        '''
+        handle = self._dragcontext.dragged_object
+
+        if handle not in self._handles:
+            return
+
+        if self._orientation == gtk.ORIENTATION_HORIZONTAL:
+            delta_size = int(self._drag_position - handle.area.x - self._dragcontext.offset_x)
+        else:
+            delta_size = int(self._drag_position - handle.area.y - self._dragcontext.offset_y)
+
+        handle_index = self._handles.index(handle)
+
+        if delta_size < 0:
+            # Enlarge the item after and shrink the items before the handle
+            enlarge = self._items[handle_index + 1]
+            shrink = reversed(self._items[:handle_index + 1])
+            self._redistribute_size(abs(delta_size), enlarge, shrink)
+        elif delta_size > 0:
+            # Enlarge the item before and shrink the items after the handle
+            enlarge = self._items[handle_index]
+            shrink = self._items[handle_index + 1:]
+            self._redistribute_size(delta_size, enlarge, shrink)
+
+    def _get_allocation_key(self, allocation):
+        '''
+        Everything do_size_allocate bases the layout on. If it did not change
+        since the last allocation, the layout can be reused.
+        '''
+        return (allocation.width, allocation.height, self._orientation, self._handle_size,
+                tuple((item.child, item.weight, item.weight_request, item.min_size,
+                       settings[item.child].expand) for item in self._items))
+
+    def _cancel_handle_drag(self):
+        if self._drag_source_id:
+            gobject.source_remove(self._drag_source_id)
+            self._drag_source_id = None
+
     ############################################################################
     # GtkContainer
     ############################################################################
@@ -798,6 +925,68 @@ class DockPaned(gtk.Container):
 
         self._remove_item(child)
 
+    def insert_items(self, children, position=None):
+        '''
+        :param children: a sequence of :class:`gtk.Widget` to use as the
+                         contents of the new items.
+        :param position: the index (starting at 0) at which to insert the
+                         first item, negative or :const:`None` to append the
+                         items after all other items.
+
+        The :meth:`insert_items` method inserts several items at once, in the
+        order given. The dockpaned is resized once and emits a single
+        `items-changed` signal instead of an `item-added` signal per item.
+        '''
+        if position is None or position < 0:
+            position = len(self)
+
+        with self.freeze_layout():
+            for offset, child in enumerate(children):
+                self._insert_item(child, position + offset)
+
+    def remove_items(self, children):
+        '''
+        :param children: a sequence of :class:`gtk.Widget` in the dockpaned.
+
+        The :meth:`remove_items` method removes several items at once. The
+        dockpaned is resized once and emits a single `items-changed` signal
+        instead of an `item-removed` signal per item.
+        '''
+        with self.freeze_layout():
+            for child in children:
+                self._remove_item(child)
+
+    def freeze_layout(self):
+        '''
+        :returns: a context manager that calls :meth:`thaw_layout` on exit.
+
+        The :meth:`freeze_layout` method postpones resizing the dockpaned and
+        the `item-added` and `item-removed` signals until :meth:`thaw_layout`
+        has been called as many times as :meth:`freeze_layout`. The children
+        added and removed in the meantime are then reported by a single
+        `items-changed` signal.
+        '''
+        self._frozen += 1
+        return LayoutFreeze(self)
+
+    def thaw_layout(self):
+        '''
+        The :meth:`thaw_layout` method reverts the effect of a previous call
+        to :meth:`freeze_layout`.
+        '''
+        assert self._frozen > 0
+        self._frozen -= 1
+
+        if self._frozen:
+            return
+
+        added, self._frozen_added = self._frozen_added, []
+        removed, self._frozen_removed = self._frozen_removed, []
+
+        if added or removed:
+            self.queue_resize()
+            self.emit('items-changed', added, removed)
+
     def item_num(self, child):
         '''
         :param child: a :class:`gtk.Widget`.
@@ -808,10 +997,10 @@ class DockPaned(gtk.Container):
         contains the widget specified by `child` or :const:`None` if no item
         contains `child`.
         '''
-        try:
-            return self.get_children().index(child)
-        except ValueError:
-            pass
+        item = self._item_map.get(child)
+
+        if item is not None:
+            return self._item_index(item)
 
     def get_nth_item(self, item_num):
         '''
@@ -863,10 +1052,11 @@ class DockPaned(gtk.Container):
         if position is None or position < 0 or position > len(self) - 1:
             position = len(self)
 
-        item = self._items[item_num]
-        self._items.remove(item)
+        item = self._items.pop(item_num)
         self._items.insert(position, item)
+        self._invalidate_indexes(min(item_num, position))
         self.queue_resize()
+        self.emit('item-reordered', child)
 
 
 ############################################################################
@@ -885,6 +1075,10 @@ def fair_scale(weight, wmpairs):
     of calculated weights that add up to weight, but are no smaller than their specified
     min_weight's.
 
+    The items that would end up below their min_weight when scaled are the ones with
+    the largest min_weight to weight ratio. They are clamped in order of that ratio, in
+    a single pass, and the remaining weight is divided over the other items.
+
     >>> fair_scale(.7, ((.3, .2), (.5, .1)))
     [0.26249999999999996, 0.43749999999999994]
     >>> fair_scale(.5, ((.3, .2), (.5, .1)))
@@ -892,24 +1086,46 @@ def fair_scale(weight, wmpairs):
     >>> fair_scale(.4, ((.3, .2), (.5, .1)))
     [0.2, 0.2]
     """
+    count = len(wmpairs)
     # List of new weights
-    n = [0] * len(wmpairs)
-    # Values that have been assigned their min_weight end up in this list:
-    skip = [False] * len(wmpairs)
-    while True:
-        try:
-            f = old_div(weight, sum(a[0] for a, s in zip(wmpairs, skip) if not s))
-        except ZeroDivisionError:
-            f = 0
-        for i, (w, m) in enumerate(wmpairs):
-            if skip[i]:
-                continue
+    n = [0] * count
+    # Values that have been assigned their min_weight are marked in this list:
+    skip = [False] * count
+    total = sum(w for w, m in wmpairs)
+    remaining = weight
+
+    for i in sorted(range(count), key=lambda i: _min_weight_ratio(*wmpairs[i]), reverse=True):
+        w, m = wmpairs[i]
+        f = old_div(remaining, total) if total else 0
+
+        if w * f >= m:
+            break  # This and all following items are not clamped
+
+        n[i] = m
+        skip[i] = True
+        remaining -= m
+        total -= w
+
+    try:
+        f = old_div(remaining, sum(a[0] for a, s in zip(wmpairs, skip) if not s))
+    except ZeroDivisionError:
+        f = 0
+
+    for i, (w, m) in enumerate(wmpairs):
+        if not skip[i]:
             n[i] = w * f
-            if n[i] < m:
-                n[i] = m
-                weight -= m
-                skip[i] = True
-                break
-        else:
-            break  # quit while loop
+
     return n
+
+
+def _min_weight_ratio(w, m):
+    '''
+    Items with a larger ratio need clamping sooner. Items without weight are
+    always clamped, unless they have no minimum weight either.
+    '''
+    if w:
+        return old_div(m, w)
+    elif m:
+        return float('inf')
+    else:
+        return float('-inf')
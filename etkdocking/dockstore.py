@@ -24,12 +24,25 @@ from __future__ import division
 # TODO make parsing XML backwards compatible
 # from builtins import str
 from builtins import map
+from builtins import range
 from past.utils import old_div
+from bisect import bisect_left
+import hashlib
+import json
+import os
+import struct
 import sys
+from io import BytesIO
+from logging import getLogger
+from queue import Queue, Empty
+from threading import Condition, Thread
+from weakref import WeakKeyDictionary
 
 from simplegeneric import generic
-from xml.etree.ElementTree import Element, SubElement, tostring, fromstring
+from xml.etree.ElementTree import fromstring
+from xml.sax.saxutils import escape
 
+import gobject
 import gtk
 
 from .docklayout import DockLayout
@@ -37,55 +50,953 @@ from etkdocking.dockframe import DockFrame
 from .dockpaned import DockPaned
 from .dockgroup import DockGroup
 from .dockitem import DockItem
+from .util import flatten
 
 SERIALIZABLE = (DockFrame, DockPaned, DockGroup, DockItem)
 
+log = getLogger('etkdocking.dockstore')
+
 
 def serialize(layout):
-    def _ser(widget, element):
+    out = BytesIO()
+    serialize_to(layout, out)
+    return out.getvalue()
+
+
+def serialize_to(layout, out, encoding=None):
+    '''
+    Write the layout to `out`, a file-like object opened in binary mode. The
+    document is written while the widget tree is walked, so no intermediate
+    element tree is built. It is byte for byte the document ElementTree's
+    tostring() produces, including the XML declaration it adds for encodings
+    other than UTF-8 and US-ASCII.
+    '''
+    _write_layout(layout, out, encoding or sys.getdefaultencoding())
+
+
+def serialize_incremental(layout, out, encoding=None):
+    '''
+    Write the layout to `out`, like serialize_to(). Subtrees that did not change
+    since the previous call (as recorded by DockLayout.mark_dirty()) are not
+    walked again: the tags encoded for them last time are written instead.
+
+    DockFrame elements are always written anew, as their size and position are
+    not tracked by the layout.
+    '''
+    _write_layout(layout, out, encoding or sys.getdefaultencoding(), _fragments)
+
+
+# Elements written by serialize_incremental(), map widget -> (encoding, fragment).
+# A fragment is a (start, children, end) tuple: the encoded start and end tags
+# and the fragments of the child elements. Fragments of unchanged children are
+# shared with the previous fragment of their parent, so the encoded tags are
+# stored once, however deep the tree is.
+_fragments = WeakKeyDictionary()
+
+
+def _write_layout(layout, out, encoding, fragments=None):
+    def encode(text):
+        return text.encode(encoding, 'xmlcharrefreplace')
+
+    def _element(widget):
         if isinstance(widget, SERIALIZABLE):
-            sub = SubElement(element, type(widget).__name__.lower(), attributes(widget))
-            widget.foreach(_ser, sub)
+            return type(widget).__name__.lower(), _children(widget)
+        return 'widget', ()
+
+    def _ser(widget):
+        tag, children = _element(widget)
+        out.write(encode(_start_tag(tag, attributes(widget), not children)))
+
+        if children:
+            for child in children:
+                _ser(child)
+            out.write(encode(u'</%s>' % tag))
+
+    def _fragment(widget):
+        cacheable = isinstance(widget, SERIALIZABLE) and not isinstance(widget, DockFrame)
+
+        if cacheable:
+            cached = fragments.get(widget)
+
+            if cached and cached[0] == encoding and not layout.is_dirty(widget):
+                return cached[1]
+
+        tag, children = _element(widget)
+        start = encode(_start_tag(tag, attributes(widget), not children))
+
+        if children:
+            fragment = (start, tuple(_fragment(child) for child in children),
+                        encode(u'</%s>' % tag))
         else:
-            sub = SubElement(element, 'widget', attributes(widget))
+            fragment = (start, (), b'')
+
+        if cacheable:
+            fragments[widget] = (encoding, fragment)
+            layout.mark_clean(widget)
+
+        return fragment
+
+    def _write_fragment(fragment):
+        start, children, end = fragment
+        out.write(start)
+        for child in children:
+            _write_fragment(child)
+        out.write(end)
+
+    # Like ElementTree, only declare encodings XML parsers do not assume
+    if encoding.lower() not in ('utf-8', 'us-ascii'):
+        out.write(encode(u"<?xml version='1.0' encoding='%s'?>\n" % encoding))
+
+    if layout.frames:
+        out.write(encode(u'<layout>'))
+        for frame in layout.frames:
+            if fragments is None:
+                _ser(frame)
+            else:
+                _write_fragment(_fragment(frame))
+        out.write(encode(u'</layout>'))
+    else:
+        out.write(encode(u'<layout />'))
+
+
+_ATTRIBUTE_ENTITIES = {'"': '&quot;', '\n': '&#10;'}
 
-    tree = Element('layout')
-    list(map(_ser, layout.frames, [tree] * len(layout.frames)))
 
-    return tostring(tree, encoding=sys.getdefaultencoding())
+def _text(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return u'%s' % value
+
+
+def _start_tag(tag, attrib, empty):
+    '''
+    Format a start tag the way ElementTree does: attributes sorted by name and
+    a space before the slash of empty elements.
+    '''
+    attrs = u''.join(u' %s="%s"' % (key, escape(_text(attrib[key]), _ATTRIBUTE_ENTITIES))
+                     for key in sorted(attrib))
+
+    if empty:
+        return u'<%s%s />' % (tag, attrs)
+    return u'<%s%s>' % (tag, attrs)
 
 
 widget_factory = {}
 
 
-def deserialize(layoutstr, itemfactory):
+def deserialize(layoutstr, itemfactory, lazy=False, loader=None, workers=4, cache_dir=None):
     '''
     Return a new layout with it's attached frames. Frames that should be floating
     already have their gtk.Window attached (check frame.get_parent()). Transient settings
     and such should be done by the invoking application.
+
+    If `lazy` is True, `itemfactory` is only called for the current item of each
+    DockGroup. The other items show their title, icon and tooltip, but their
+    child widget is constructed the first time they become the current item.
+
+    If a `loader` is provided, the layout is returned with empty items. The
+    slow part of constructing the item contents, ``loader(name)``, is then
+    run by a pool of `workers` threads, current items first. Each result is
+    handed to ``itemfactory(name, data)`` from the main loop, so the factory
+    can safely construct widgets. When combined with `lazy`, only the current
+    items are loaded in the background. Selecting an item before it has been
+    loaded runs its loader right away, or waits for the thread that is
+    running it. The application is responsible for calling
+    gobject.threads_init().
+
+    If `cache_dir` is provided, the construction plan compiled from
+    `layoutstr` (see compile_plan()) is stored in that directory, and reused
+    the next time the same layout string is restored. The directory holds the
+    PLAN_CACHE_SIZE most recently used plans.
     '''
+    if cache_dir:
+        plan = _cached_plan(layoutstr, cache_dir)
+    else:
+        plan = compile_plan(layoutstr)
+
+    layout = DockLayout()
+    widgets = []
+
+    for parent, tag, attrib in plan:
+        parent_widget = widgets[parent] if parent >= 0 else layout
+        widgets.append(_build(tag, attrib, parent_widget, itemfactory, lazy, loader))
+
+    _finish_items(layout, lazy, loader, workers)
+
+    return layout
+
+
+PLAN_VERSION = 2
+
+# Number of plans kept in a cache directory
+PLAN_CACHE_SIZE = 16
+
+_INT_ATTRIBUTES = ('pos', 'vispos', 'width', 'height', 'x', 'y')
+
+
+def compile_plan(layoutstr):
+    '''
+    Parse `layoutstr` into a flat construction plan: a list of
+    ``(parent, tag, attrib)`` operations in document order, where `parent` is
+    the index of the operation that builds the parent widget, or -1 for the
+    layout itself. Attribute values are converted to the types the widget
+    factories expect.
+    '''
+    plan = []
+
+    def _compile(element, parent):
+        plan.append((parent, element.tag, _plan_attrib(element.attrib)))
+        index = len(plan) - 1
+        for child in element:
+            _compile(child, index)
+
+    for element in fromstring(layoutstr):
+        _compile(element, -1)
+
+    return plan
+
 
-    def _des(element, parent_widget=None):
-        if element.tag == 'widget':
-            name = element.attrib['name']
-            widget = itemfactory(name)
-            widget.set_name(name)
-            parent_widget.add(widget)
+def _plan_attrib(attrib):
+    attrib = dict(attrib)
+
+    for key in _INT_ATTRIBUTES:
+        if key in attrib:
+            attrib[key] = int(attrib[key])
+
+    if 'weight' in attrib:
+        attrib['weight'] = _weight(attrib['weight'])
+
+    return attrib
+
+
+def _cached_plan(layoutstr, cache_dir):
+    '''
+    Return the construction plan for `layoutstr`, reading it from, or
+    writing it to, a JSON file in `cache_dir` named after the hash of the
+    layout.
+    '''
+    if isinstance(layoutstr, bytes):
+        key = layoutstr
+    else:
+        key = layoutstr.encode('utf-8')
+
+    path = os.path.join(cache_dir, 'layout-%s.plan' % hashlib.sha1(key).hexdigest())
+
+    try:
+        with open(path, 'rb') as f:
+            cached = json.loads(f.read().decode('utf-8'))
+    except (IOError, OSError, ValueError):
+        # Missing, unreadable or corrupt cache file, compile a new plan
+        cached = None
+
+    if isinstance(cached, dict) and cached.get('version') == PLAN_VERSION:
+        # Mark the plan as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return [tuple(op) for op in cached['plan']]
+
+    plan = compile_plan(layoutstr)
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps({'version': PLAN_VERSION, 'plan': plan}).encode('utf-8'))
+        os.rename(tmp_path, path)
+    except (IOError, OSError):
+        log.warning('Unable to cache layout plan in %s' % cache_dir, exc_info=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    else:
+        _prune_plans(cache_dir, path)
+
+    return plan
+
+
+def _prune_plans(cache_dir, keep):
+    '''
+    Remove the least recently used plans from `cache_dir`, keeping
+    PLAN_CACHE_SIZE of them, including the plan at path `keep`.
+    '''
+    plans = []
+
+    try:
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            if name.startswith('layout-') and name.endswith('.plan') and path != keep:
+                plans.append((os.path.getmtime(path), path))
+
+        plans.sort()
+
+        for mtime, path in plans[:max(len(plans) - PLAN_CACHE_SIZE + 1, 0)]:
+            os.remove(path)
+    except OSError:
+        log.warning('Unable to prune layout plans in %s' % cache_dir, exc_info=True)
+
+
+# Marker for _DeferredChild.data
+_NOT_LOADED = object()
+
+# Guards _DeferredChild.data and _DeferredChild.loading
+_load_condition = Condition()
+
+
+class _DeferredChild(object):
+    '''
+    Child factory for items restored by a lazy or background deserialize().
+    Until it is called, it stands in for the child widget when the layout is
+    serialized.
+    '''
+    __slots__ = ['itemfactory', 'name', 'loader', 'data', 'loading']
+
+    def __init__(self, itemfactory, name, loader=None):
+        self.itemfactory = itemfactory
+        self.name = name
+        self.loader = loader
+        self.data = _NOT_LOADED
+        self.loading = False
+
+    def load(self):
+        '''
+        Run the loader and return its result. The loader runs only once: if
+        it is running in another thread already, wait for it to finish.
+        '''
+        with _load_condition:
+            while self.loading:
+                _load_condition.wait()
+
+            if self.data is not _NOT_LOADED:
+                return self.data
+
+            self.loading = True
+
+        data = _NOT_LOADED
+
+        try:
+            data = self.loader(self.name)
+        finally:
+            # If the loader failed, a later call runs it again. The item keeps
+            # its child factory, see DockItem.materialize()
+            with _load_condition:
+                self.data = data
+                self.loading = False
+                _load_condition.notify_all()
+
+        return data
+
+    def __call__(self):
+        if self.loader:
+            widget = self.itemfactory(self.name, self.load())
         else:
-            factory = widget_factory[element.tag]
-            widget = factory(parent=parent_widget, **element.attrib)
-            assert widget, 'No widget (%s)' % widget
-            if len(element):
-                list(map(_des, element, [widget] * len(element)))
+            widget = self.itemfactory(self.name)
+        widget.set_name(self.name)
         return widget
 
-    tree = fromstring(layoutstr)
+
+def _build(tag, attrib, parent_widget, itemfactory, lazy=False, loader=None):
+    '''
+    Construct the widget for a single element and add it to `parent_widget`.
+    '''
+    if tag == 'widget':
+        name = attrib['name']
+
+        if lazy or loader:
+            parent_widget.set_child_factory(_DeferredChild(itemfactory, name, loader))
+            return None
+
+        widget = itemfactory(name)
+        widget.set_name(name)
+        parent_widget.add(widget)
+    else:
+        factory = widget_factory[tag]
+        widget = factory(parent=parent_widget, **attrib)
+        assert widget, 'No widget (%s)' % widget
+    return widget
+
+
+def _finish_items(layout, lazy, loader, workers):
+    if loader:
+        _load_in_background(layout, lazy, workers)
+    elif lazy:
+        _materialize_current_items(layout)
+
+
+def _load_in_background(layout, lazy, workers):
+    '''
+    Run the loaders of deferred items in a pool of threads, current items
+    first, and add the child widgets from the main loop as results come in.
+    '''
+    current_items = []
+    other_items = []
+
+    for frame in layout.frames:
+        for group in flatten(frame):
+            if isinstance(group, DockGroup) and len(group):
+                current_item = group.get_nth_item(group.get_current_item())
+
+                for item in group.items:
+                    if not isinstance(item.get_child_factory(), _DeferredChild):
+                        continue
+                    if item is current_item:
+                        current_items.append(item)
+                    elif not lazy:
+                        other_items.append(item)
+
+    jobs = Queue()
+
+    for item in current_items:
+        jobs.put((item, item.get_child_factory(), gobject.PRIORITY_DEFAULT_IDLE))
+
+    for item in other_items:
+        jobs.put((item, item.get_child_factory(), gobject.PRIORITY_LOW))
+
+    def _loaded(item, deferred):
+        # The item may have been materialized already, when it was selected
+        if item.get_child_factory() is deferred:
+            item.materialize()
+        return False
+
+    def _work():
+        while True:
+            try:
+                item, deferred, priority = jobs.get_nowait()
+            except Empty:
+                return
+
+            # Items selected in the mean time have been loaded (or are being
+            # loaded) from the main loop, load() does not run the loader again
+            try:
+                deferred.load()
+            except Exception:
+                log.error('Loading item %s failed' % deferred.name, exc_info=True)
+            else:
+                gobject.idle_add(_loaded, item, deferred, priority=priority)
+
+    for n in range(min(workers, len(current_items) + len(other_items))):
+        thread = Thread(target=_work)
+        thread.daemon = True
+        thread.start()
+
+
+def _materialize_current_items(layout):
+    for frame in layout.frames:
+        for group in flatten(frame):
+            if isinstance(group, DockGroup) and len(group):
+                group.get_nth_item(group.get_current_item()).materialize()
+
+
+def _children(widget):
+    '''
+    The widgets to serialize as child elements of `widget`. For items with a
+    deferred child widget, that is the pending child.
+    '''
+    children = widget.get_children()
+
+    if not children and isinstance(widget, DockItem) and \
+            isinstance(widget.get_child_factory(), _DeferredChild):
+        children = [widget.get_child_factory()]
+
+    return children
+
+
+############################################################################
+# Binary layout format
+#
+# The document starts with a header (magic and format version), followed by
+# a table of all strings used in the document. Next come the elements, in the
+# same order as in the XML document: every element is a record, prefixed with
+# its length, holding the tag, the number of attributes and the number of
+# child elements, followed by the attributes. Attribute names and string
+# values are stored as an index into the string table, weights are stored as
+# doubles.
+############################################################################
+BINARY_MAGIC = b'ETKL'
+BINARY_VERSION = 1
+
+_BINARY_TAGS = ('dockframe', 'dockpaned', 'dockgroup', 'dockitem', 'widget')
+_BINARY_TAG_CODES = dict((tag, code) for code, tag in enumerate(_BINARY_TAGS))
+
+_STRING_VALUE = 0
+_FLOAT_VALUE = 1
+
+_HEADER = struct.Struct('<4sH')
+_COUNT = struct.Struct('<I')
+_LENGTH = struct.Struct('<I')  # string and record lengths
+_RECORD = struct.Struct('<BBI')  # tag, number of attributes, number of children
+_ATTRIBUTE = struct.Struct('<IB')  # name, value type
+_STRING = struct.Struct('<I')
+_FLOAT = struct.Struct('<d')
+
+
+def serialize_binary(layout):
+    '''
+    Return the layout in the binary layout format. The document holds the same
+    elements and attributes as the one returned by serialize(), except that
+    weights are stored exactly instead of as whole percents.
+    '''
+    strings = {}
+    records = BytesIO()
+
+    def string_index(text):
+        text = _text(text)
+        try:
+            return strings[text]
+        except KeyError:
+            index = strings[text] = len(strings)
+            return index
+
+    def _ser(widget):
+        if isinstance(widget, SERIALIZABLE):
+            tag = type(widget).__name__.lower()
+            children = _children(widget)
+        else:
+            tag = 'widget'
+            children = ()
+
+        attrib = attributes(widget)
+
+        if 'weight' in attrib:
+            attrib['weight'] = _paned_item(widget).weight
+
+        record = [_RECORD.pack(_BINARY_TAG_CODES[tag], len(attrib), len(children))]
+
+        for key, value in attrib.items():
+            if isinstance(value, float):
+                record.append(_ATTRIBUTE.pack(string_index(key), _FLOAT_VALUE))
+                record.append(_FLOAT.pack(value))
+            else:
+                record.append(_ATTRIBUTE.pack(string_index(key), _STRING_VALUE))
+                record.append(_STRING.pack(string_index(value)))
+
+        record = b''.join(record)
+        records.write(_LENGTH.pack(len(record)))
+        records.write(record)
+        list(map(_ser, children))
+
+    list(map(_ser, layout.frames))
+
+    out = BytesIO()
+    out.write(_HEADER.pack(BINARY_MAGIC, BINARY_VERSION))
+    out.write(_COUNT.pack(len(strings)))
+
+    for text in sorted(strings, key=strings.get):
+        data = text.encode('utf-8')
+        out.write(_LENGTH.pack(len(data)))
+        out.write(data)
+
+    out.write(_COUNT.pack(len(layout.frames)))
+    out.write(records.getvalue())
+
+    return out.getvalue()
+
+
+def deserialize_binary(data, itemfactory, lazy=False, loader=None, workers=4):
+    '''
+    Return a new layout from a document created by serialize_binary(). See
+    deserialize() for details.
+    '''
+    magic, version = _HEADER.unpack_from(data, 0)
+
+    if magic != BINARY_MAGIC:
+        raise ValueError('Not a binary layout document')
+    if version > BINARY_VERSION:
+        raise ValueError('Unsupported binary layout version %d' % version)
+
+    offset = _HEADER.size
+    strings = []
+    (count,) = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+
+    for n in range(count):
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        strings.append(data[offset:offset + length].decode('utf-8'))
+        offset += length
+
+    def _des(offset, parent_widget):
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        end = offset + length
+        tag, n_attributes, n_children = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        attrib = {}
+
+        for n in range(n_attributes):
+            key, kind = _ATTRIBUTE.unpack_from(data, offset)
+            offset += _ATTRIBUTE.size
+
+            if kind == _STRING_VALUE:
+                attrib[strings[key]] = strings[_STRING.unpack_from(data, offset)[0]]
+                offset += _STRING.size
+            elif kind == _FLOAT_VALUE:
+                attrib[strings[key]] = _FLOAT.unpack_from(data, offset)[0]
+                offset += _FLOAT.size
+            else:
+                # Unknown value type, skip the remaining attributes
+                break
+
+        widget = _build(_BINARY_TAGS[tag], attrib, parent_widget, itemfactory, lazy, loader)
+        offset = end
+
+        for n in range(n_children):
+            offset = _des(offset, widget)
+
+        return offset
+
     layout = DockLayout()
-    list(map(_des, tree, [layout] * len(tree)))
+    (count,) = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+
+    for n in range(count):
+        offset = _des(offset, layout)
+
+    _finish_items(layout, lazy, loader, workers)
 
     return layout
 
 
+############################################################################
+# Layout diff and patch
+#
+# diff() compares a live layout with a serialized one and returns a list of
+# operations, patch() applies them in place. Items are identified by the
+# name of their child widget, so items that are part of both layouts are
+# moved instead of rebuilt. Containers are matched by position: where both
+# layouts have the same structure only orientations and weights change,
+# elsewhere the old container is replaced by a new one.
+#
+# Operations, in the order in which they are applied:
+#
+#   ('remove', item)                      the item is not part of the new layout
+#   ('frame', path, frame)                reuse a frame
+#   ('add-frame', path, attrib)           create a new frame
+#   ('replace', path, tag, attrib)        replace the container at path
+#   ('build', path, tag, attrib)          add a container to a new container
+#   ('orientation', path, orientation)    change the orientation of a paned
+#   ('weight', path, weight)              change the weight of a container
+#   ('name', path, name)                  change the name of a group, None
+#                                         for the default name
+#   ('move', item, path, position)        move an item to the group at path
+#   ('insert', path, position, attrib, name)
+#                                         add a new item to the group at path
+#   ('remove-frame', frame)               remove a frame that is not reused
+#
+# A path is the index of the frame in the new layout, followed by the index
+# of each container in its parent container.
+############################################################################
+
+
+def diff(layout, layoutstr):
+    '''
+    Return the operations needed to turn `layout` into the layout described
+    by `layoutstr`. The layout is not changed, use patch() for that.
+    '''
+    live_items = {}  # Map key -> DockItem
+    current = {}  # Map group (or path of a reused group) -> [key, ...]
+    target = []  # [(path, [dockitem element, ...]), ...]
+    structure = []
+    unused = list(layout.frames)
+    floating = set(layout.get_floating_frames())
+
+    for frame in layout.frames:
+        for group in flatten(frame):
+            if isinstance(group, DockGroup):
+                keys = current[group] = []
+                for item in group.items:
+                    key = _item_key(item)
+                    if key is None or key in live_items:
+                        key = item
+                    live_items[key] = item
+                    keys.append(key)
+
+    def _build_ops(element, path, op):
+        structure.append((op, path, element.tag, _plan_attrib(element.attrib)))
+
+        if element.tag == 'dockgroup':
+            target.append((path, [e for e in element if e.tag == 'dockitem']))
+        else:
+            for i, child in enumerate(element):
+                _build_ops(child, path + (i,), 'build')
+
+    def _match(widget, element, path):
+        tag = element.tag
+
+        if type(widget).__name__.lower() != tag or \
+                (tag == 'dockpaned' and len(widget) != len(element)):
+            _build_ops(element, path, 'replace')
+            return False
+
+        if tag == 'dockgroup':
+            name = element.get('name')
+            if attributes(widget).get('name') != name:
+                structure.append(('name', path, name))
+
+            current[path] = current.pop(widget)
+            target.append((path, [e for e in element if e.tag == 'dockitem']))
+        else:
+            orientation = element.get('orientation')
+            if attributes(widget)['orientation'] != orientation:
+                structure.append(('orientation', path, orientation))
+
+            for i, (child, child_element) in enumerate(zip(widget.get_children(), element)):
+                weight = child_element.get('weight')
+                if _match(child, child_element, path + (i,)) and weight is not None:
+                    # Weights are saved as whole percents
+                    weight = _weight(weight)
+                    if abs(widget.child_get_property(child, 'weight') - weight) >= .01:
+                        structure.append(('weight', path + (i,), weight))
+
+        return True
+
+    for f, element in enumerate(fromstring(layoutstr)):
+        path = (f,)
+        frame = _best_frame(unused, floating, element)
+
+        if frame:
+            unused.remove(frame)
+            structure.append(('frame', path, frame))
+            for child_element in element:
+                _match(frame.child, child_element, path + (0,))
+        else:
+            structure.append(('add-frame', path, _plan_attrib(element.attrib)))
+            for child_element in element:
+                _build_ops(child_element, path + (0,), 'replace')
+
+    # Items without a name, or with a name that's been seen already, are new
+    elements = {}
+
+    for path, items in target:
+        for i, element in enumerate(items):
+            key = _element_key(element)
+            if key is None or key in elements:
+                key = element
+            elements[key] = element
+            items[i] = key
+
+    ops = []
+
+    for keys in current.values():
+        ops.extend(('remove', live_items[key]) for key in keys if key not in elements)
+        keys[:] = [key for key in keys if key in elements]
+
+    ops.extend(structure)
+
+    for key, path, position in _item_moves(current, target):
+        if key in live_items:
+            ops.append(('move', live_items[key], path, position))
+        else:
+            element = elements[key]
+            ops.append(('insert', path, position, _plan_attrib(element.attrib), _element_key(element)))
+
+    ops.extend(('remove-frame', frame) for frame in unused)
+
+    return ops
+
+
+def patch(layout, ops, itemfactory):
+    '''
+    Apply the operations computed by diff() to `layout`. New items get their
+    child widget from `itemfactory`, like with deserialize(). Groups keep
+    their current item if it is still part of the group. New floating frames
+    are not shown, reused frames keep their size and position.
+
+    Returns the items that have been removed from the layout. They are not
+    destroyed, so they can be reused.
+    '''
+    widgets = {}  # Map path -> container
+    replaced = []
+    removed = []
+    current_items = [(group, group.get_nth_item(group.get_current_item()))
+                     for frame in layout.frames for group in flatten(frame)
+                     if isinstance(group, DockGroup) and len(group)]
+
+    def _lookup(path):
+        if path not in widgets:
+            widgets[path] = _nth_container(_lookup(path[:-1]), path[-1])
+        return widgets[path]
+
+    for op in ops:
+        kind = op[0]
+
+        if kind == 'remove':
+            item = op[1]
+            item.get_parent().remove(item)
+            removed.append(item)
+        elif kind == 'frame':
+            widgets[op[1]] = op[2]
+        elif kind == 'add-frame':
+            widgets[op[1]] = widget_factory['dockframe'](parent=layout, **op[2])
+        elif kind in ('replace', 'build'):
+            path, tag, attrib = op[1:]
+            parent = _lookup(path[:-1])
+
+            if kind == 'replace':
+                old = _nth_container(parent, path[-1])
+                if old:
+                    parent.remove(old)
+                    replaced.append(old)
+
+            widget = widgets[path] = widget_factory[tag](parent=parent, **attrib)
+
+            if isinstance(parent, DockPaned):
+                parent.reorder_item(widget, path[-1])
+        elif kind == 'orientation':
+            _lookup(op[1]).set_orientation(op[2] == 'horizontal' and gtk.ORIENTATION_HORIZONTAL
+                                           or gtk.ORIENTATION_VERTICAL)
+        elif kind == 'weight':
+            path, weight = op[1:]
+            _lookup(path[:-1]).child_set_property(_lookup(path), 'weight', weight)
+        elif kind == 'name':
+            group = _lookup(op[1])
+            group.set_name(op[2] or group.__gtype__.name)
+        elif kind == 'move':
+            item, path, position = op[1:]
+            group = _lookup(path)
+            parent = item.get_parent()
+
+            if parent is group:
+                group.reorder_item(item, position)
+            else:
+                parent.remove(item)
+                group.insert_item(item, position)
+        elif kind == 'insert':
+            path, position, attrib, name = op[1:]
+            attrib = dict(attrib, pos=position)
+            attrib.pop('vispos', None)
+            item = widget_factory['dockitem'](parent=_lookup(path), **attrib)
+            if name is not None:
+                _build('widget', {'name': name}, item, itemfactory)
+        elif kind == 'remove-frame':
+            frame = op[1]
+            layout.remove(frame)
+            parent = frame.get_parent()
+            if isinstance(parent, gtk.Window):
+                parent.destroy()
+            else:
+                frame.destroy()
+        else:
+            raise ValueError('Unknown operation %s' % kind)
+
+    for widget in replaced:
+        widget.destroy()
+
+    for group, item in current_items:
+        if item.get_parent() is group:
+            group.set_current_item(group.item_num(item))
+
+    return removed
+
+
+def _item_key(item):
+    children = _children(item)
+    return children and attributes(children[0])['name'] or None
+
+
+def _element_key(element):
+    for child in element:
+        if child.tag == 'widget':
+            return child.get('name')
+
+
+def _best_frame(frames, floating, element):
+    '''
+    Find the frame in `frames` that matches `element` best: a frame of the
+    same kind (main or floating) that holds most of its items.
+    '''
+    keys = set(_element_key(e) for e in element.iter('dockitem'))
+    candidates = [frame for frame in frames
+                  if (frame in floating) == (element.get('floating') == 'true')
+                  and (frame.child is not None) == (len(element) > 0)]
+
+    def _shared(frame):
+        return len(keys.intersection(_item_key(w) for w in flatten(frame) if isinstance(w, DockItem)))
+
+    if candidates:
+        return max(candidates, key=_shared)
+
+
+def _nth_container(parent, index):
+    if isinstance(parent, DockPaned):
+        return parent.get_nth_item(index)
+    return parent.child
+
+
+def _item_moves(current, target):
+    '''
+    Compute where items should move, to turn the item order in `current`, a
+    dict mapping groups to lists of item keys, into `target`, a list of
+    (group, keys) tuples. Within a group, the longest sequence of items that
+    is in the right order already stays in place. Returns a list of
+    (key, group, position) tuples, to be applied in order.
+    '''
+    current = dict((group, list(keys)) for group, keys in current.items())
+    where = {}
+
+    for group, keys in current.items():
+        for key in keys:
+            where[key] = group
+
+    moves = []
+
+    for group, keys in target:
+        row = current.setdefault(group, [])
+        stable = _stable_keys(row, keys)
+
+        for i, key in enumerate(keys):
+            if key in stable:
+                continue
+
+            source = where.get(key)
+            old = None
+
+            if source is not None:
+                old = current[source].index(key)
+                current[source].remove(key)
+
+            # Place the item right after its predecessor, which is in place
+            position = row.index(keys[i - 1]) + 1 if i else 0
+            row.insert(position, key)
+            where[key] = group
+
+            if source != group or old != position:
+                moves.append((key, group, position))
+
+    return moves
+
+
+def _stable_keys(row, keys):
+    '''
+    Return the longest set of keys in `row` that are in the same order as
+    in `keys` (a longest increasing subsequence).
+    '''
+    order = dict((key, i) for i, key in enumerate(keys))
+    sequence = [key for key in row if key in order]
+    tails = []  # Smallest target index that ends a sequence of length i + 1
+    ends = []  # Position in sequence of that key
+    previous = [None] * len(sequence)
+
+    for n, key in enumerate(sequence):
+        i = bisect_left(tails, order[key])
+        if i:
+            previous[n] = ends[i - 1]
+        if i == len(tails):
+            tails.append(order[key])
+            ends.append(n)
+        else:
+            tails[i] = order[key]
+            ends[i] = n
+
+    stable = set()
+    n = ends[-1] if ends else None
+
+    while n is not None:
+        stable.add(sequence[n])
+        n = previous[n]
+
+    return stable
+
+
 def get_main_frames(layout):
     return (f for f in layout.frames \
             if not isinstance(f.get_parent(), gtk.Window))
@@ -117,13 +1028,27 @@ def parent_attributes(widget):
     d = {}
 
     if isinstance(container, DockPaned):
-        paned_item = [i for i in container._items if i.child is widget][0]
+        paned_item = _paned_item(widget)
         if paned_item.weight:
             d['weight'] = str(int(paned_item.weight * 100))
 
     return d
 
 
+def _paned_item(widget):
+    return widget.get_parent()._item_for_child(widget)
+
+
+def _weight(weight):
+    """
+    Weights are stored as whole percents in XML documents, the binary format
+    stores the fraction itself.
+    """
+    if isinstance(weight, float):
+        return weight
+    return old_div(float(weight), 100.)
+
+
 @generic
 def attributes(widget):
     raise NotImplementedError
@@ -134,6 +1059,11 @@ def widget_attributes(widget):
     return {'name': widget.get_name() or 'empty'}
 
 
+@attributes.when_type(_DeferredChild)
+def deferred_child_attributes(widget):
+    return {'name': widget.name}
+
+
 @attributes.when_type(DockItem)
 def dock_item_attributes(widget):
     d = {'title': widget.props.title,
@@ -207,7 +1137,7 @@ def dock_group_factory(parent, weight=None, name=None):
         group.set_name(name)
 
     if weight is not None:
-        parent.insert_item(group, weight=old_div(float(weight), 100.))
+        parent.insert_item(group, weight=_weight(weight))
     else:
         parent.add(group)
 
@@ -227,7 +1157,7 @@ def dock_paned_factory(parent, orientation, weight=None, name=None):
         paned.set_orientation(gtk.ORIENTATION_VERTICAL)
 
     if weight is not None:
-        item = parent.insert_item(paned, weight=old_div(float(weight), 100.))
+        item = parent.insert_item(paned, weight=_weight(weight))
     else:
         parent.add(paned)
 
@@ -38,6 +38,8 @@ class HslColor(gobject.GObject):
     def __init__(self, color):
         gobject.GObject.__init__(self)
 
+        self._h = 0.0
+        self._s = 0.0
         self._update_hsl(color)
         self._update_rgb()
 
@@ -124,90 +126,112 @@ class HslColor(gobject.GObject):
         return gdk.Color(*self.get_rgb_float())
 
     def _update_hsl(self, color):
-        r = color.red / float(65535)
-        g = color.green / float(65535)
-        b = color.blue / float(65535)
+        (h, s, self._l) = color_to_hsl(color)
 
-        v = max((r, g, b))
-        m = min((r, g, b))
+        # Black has no saturation and greys have no hue, keep what we had
+        if self._l > 0.0:
+            self._s = s
 
-        self._l = (m + v) / 2.0
+            if s > 0.0:
+                self._h = h
 
-        if self._l <= 0.0:
-            return
+    def _update_rgb(self):
+        self._h = min(max(self._h, 0), 1)
+        self._s = min(max(self._s, 0), 1)
+        self._l = min(max(self._l, 0), 1)
+
+        (self._red_float, self._green_float, self._blue_float) = hsl_to_rgb(self._h, self._s, self._l)
+
+
+def color_to_hsl(color):
+    '''
+    Convert a gdk.Color to a (hue, saturation, lightness) tuple of floats
+    ranging from 0.0 to 1.0.
+    '''
+    return rgb_to_hsl(color.red / float(65535), color.green / float(65535), color.blue / float(65535))
+
+
+def rgb_to_hsl(r, g, b):
+    '''
+    Convert red, green and blue floats ranging from 0.0 to 1.0 to a (hue,
+    saturation, lightness) tuple of floats ranging from 0.0 to 1.0.
+    '''
+    v = max((r, g, b))
+    m = min((r, g, b))
+
+    l = (m + v) / 2.0
+
+    if l <= 0.0:
+        return (0.0, 0.0, l)
+
+    vm = v - m
+    s = vm
+
+    if s > 0.0:
+        if l <= 0.5:
+            s = s / (v + m)
+        else:
+            s = s / (2.0 - v - m)
+    else:
+        return (0.0, 0.0, l)
 
-        vm = v - m
-        self._s = vm
+    r2 = (v - r) / vm
+    g2 = (v - g) / vm
+    b2 = (v - b) / vm
 
-        if self._s > 0.0:
-            if self._l <= 0.5:
-                self._s = self._s / (v + m)
-            else:
-                self._s = self._s / (2.0 - v - m)
+    if r == v:
+        if g == m:
+            h = 5.0 + b2
         else:
-            return
-
-        r2 = (v - r) / vm
-        g2 = (v - g) / vm
-        b2 = (v - b) / vm
-
-        if r == v:
-            if g == m:
-                self._h = 5.0 + b2
-            else:
-                self._h = 1.0 - g2
-        elif g == v:
-            if b == m:
-                self._h = 1.0 + r2
-            else:
-                self._h = 3.0 - b2
+            h = 1.0 - g2
+    elif g == v:
+        if b == m:
+            h = 1.0 + r2
         else:
-            if r == m:
-                self._h = 3.0 + g2
-            else:
-                self._h = 5.0 - r2
+            h = 3.0 - b2
+    else:
+        if r == m:
+            h = 3.0 + g2
+        else:
+            h = 5.0 - r2
 
-        self._h = self._h / 6.0
+    return (h / 6.0, s, l)
 
-    def _update_rgb(self):
-        if self._h > 1: self._h = 1
-        if self._h < 0: self._h = 0
-        if self._s > 1: self._s = 1
-        if self._s < 0: self._s = 0
-        if self._l > 1: self._l = 1
-        if self._l < 0: self._l = 0
-
-        if self._l == 0:
-            self._red_float = self._green_float = self._blue_float = 0.0
-        elif self._s == 0:
-            self._red_float = self._green_float = self._blue_float = self._l
+
+def hsl_to_rgb(h, s, l):
+    '''
+    Convert hue, saturation and lightness floats ranging from 0.0 to 1.0 to a
+    (red, green, blue) tuple of floats ranging from 0.0 to 1.0.
+    '''
+    if l == 0:
+        return (0.0, 0.0, 0.0)
+    elif s == 0:
+        return (l, l, l)
+
+    if l <= 0.5:
+        t2 = l * (1.0 + s)
+    else:
+        t2 = l + s - (l * s)
+
+    t1 = 2.0 * l - t2
+
+    t3 = [h + 1.0 / 3.0, h, h - 1.0 / 3.0]
+    clr = [0.0, 0.0, 0.0]
+
+    for i in range(3):
+        if t3[i] < 0:
+            t3[i] += 1.0
+
+        if t3[i] > 1:
+            t3[i] -= 1.0
+
+        if 6.0 * t3[i] < 1.0:
+            clr[i] = t1 + (t2 - t1) * t3[i] * 6.0
+        elif 2.0 * t3[i] < 1.0:
+            clr[i] = t2
+        elif 3.0 * t3[i] < 2.0:
+            clr[i] = t1 + (t2 - t1) * ((2.0 / 3.0) - t3[i]) * 6.0
         else:
-            if self._l <= 0.5:
-                t2 = self._l * (1.0 + self._s)
-            else:
-                t2 = self._l + self._s - (self._l * self._s)
-
-            t1 = 2.0 * self._l - t2
-
-            t3 = [self._h + 1.0 / 3.0, self._h, self._h - 1.0 / 3.0]
-            clr = [0.0, 0.0, 0.0]
-
-            for i in range(3):
-                if t3[i] < 0:
-                    t3[i] += 1.0
-
-                if t3[i] > 1:
-                    t3[i] -= 1.0
-
-                if 6.0 * t3[i] < 1.0:
-                    clr[i] = t1 + (t2 - t1) * t3[i] * 6.0
-                elif 2.0 * t3[i] < 1.0:
-                    clr[i] = t2
-                elif 3.0 * t3[i] < 2.0:
-                    clr[i] = t1 + (t2 - t1) * ((2.0 / 3.0) - t3[i]) * 6.0
-                else:
-                    clr[i] = t1
-
-            self._red_float = clr[0]
-            self._green_float = clr[1]
-            self._blue_float = clr[2]
+            clr[i] = t1
+
+    return tuple(clr)
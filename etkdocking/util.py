@@ -48,14 +48,53 @@ def rect_overlaps(rect, x, y):
         return False
 
 
+_icon_cache = {}  # Map (icon name, size, theme generation) -> gdk.Pixbuf
+_icon_theme = None  # The default icon theme, once load_icon() connected to it
+_icon_theme_generation = 0  # Incremented every time the default icon theme changes
+
+
+def _on_icon_theme_changed(icontheme):
+    global _icon_theme_generation
+    _icon_theme_generation += 1
+    _icon_cache.clear()
+
+
+def icon_theme_generation():
+    '''
+    The icon_theme_generation function returns a number that changes every
+    time the default icon theme changes. Pixbufs returned by load_icon for an
+    older generation are outdated.
+    '''
+    return _icon_theme_generation
+
+
 # TODO: Should change/add on this 'cause it does not work well with IconFactories for example.
 def load_icon(icon_name, size):
+    '''
+    The load_icon function returns a pixbuf for icon_name at size pixels from
+    the default icon theme. Pixbufs are cached and shared between callers, so
+    they must not be modified.
+    '''
+    global _icon_theme
     icontheme = gtk.icon_theme_get_default()
 
+    if icontheme is not _icon_theme:
+        icontheme.connect('changed', _on_icon_theme_changed)
+        _icon_theme = icontheme
+        _on_icon_theme_changed(icontheme)
+
+    key = (icon_name, size, _icon_theme_generation)
+
+    try:
+        return _icon_cache[key]
+    except KeyError:
+        pass
+
     if not icontheme.has_icon(icon_name):
         icon_name = 'gtk-missing-image'
 
-    return icontheme.load_icon(icon_name, size, gtk.ICON_LOOKUP_USE_BUILTIN)
+    pixbuf = _icon_cache[key] = icontheme.load_icon(icon_name, size, gtk.ICON_LOOKUP_USE_BUILTIN)
+    return pixbuf
 
 
 def load_icon_image(icon_name, size):
@@ -79,3 +118,21 @@ def flatten(w, child_getter=gtk.Container.get_children):
                 yield d
     except TypeError:
         pass  # Not a child of the right type
+
+
+class LayoutFreeze(object):
+    '''
+    Returned by the freeze_layout() methods of DockPaned and DockGroup, so a
+    batch of changes can be written as ``with container.freeze_layout(): ...``.
+    The container is thawed when the block exits.
+    '''
+    __slots__ = ('widget',)
+
+    def __init__(self, widget):
+        self.widget = widget
+
+    def __enter__(self):
+        return self.widget
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.widget.thaw_layout()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# vim:sw=4:et:ai
+
+# Copyright © 2010 etk.docking Contributors
+#
+# This file is part of etk.docking.
+#
+# etk.docking is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# etk.docking is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with etk.docking. If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import unittest
+
+import pygtk
+
+pygtk.require('2.0')
+import gtk
+import gtk.gdk as gdk
+
+from etkdocking import compacticons
+from etkdocking.compactbutton import CompactButton
+
+
+def _rows(pixbuf):
+    pixels = pixbuf.get_pixels()
+    rowstride = pixbuf.get_rowstride()
+    width = pixbuf.get_width() * pixbuf.get_n_channels()
+    return [pixels[y * rowstride:y * rowstride + width] for y in range(pixbuf.get_height())]
+
+
+class TestCompactButton(unittest.TestCase):
+    def test_sprite_matches_icons(self):
+        path = os.path.join(os.path.dirname(compacticons.__file__), 'icons', '16x16')
+        size = compacticons.ICON_SIZE
+        sprite = gdk.pixbuf_new_from_data(compacticons.SPRITE, gdk.COLORSPACE_RGB, True, 8,
+                                          compacticons.SPRITE_WIDTH, compacticons.SPRITE_HEIGHT,
+                                          compacticons.SPRITE_ROWSTRIDE)
+
+        for index, icon_name in enumerate(compacticons.ICON_NAMES):
+            expected = gdk.pixbuf_new_from_file(os.path.join(path, icon_name + '.png'))
+            icon = sprite.subpixbuf(index * size, 0, size, size)
+
+            self.assertEquals(_rows(expected), _rows(icon))
+
+    def test_icons_registered_on_realize(self):
+        button = CompactButton('compact-close')
+        window = gtk.Window()
+        window.add(button)
+        window.show_all()
+
+        self.assertTrue(button._icon_normal is not None)
+        self.assertTrue(gtk.icon_theme_get_default().has_icon('compact-close'))
+
+        window.destroy()
@@ -25,6 +25,7 @@ import pygtk
 
 pygtk.require('2.0')
 import gtk
+import gtk.gdk as gdk
 from etkdocking import DockItem, DockGroup
 
 
@@ -84,6 +85,47 @@ class TestDockGroup(unittest.TestCase):
         dockitem1.destroy()
         dockgroup.destroy()
 
+    def test_items_changed_signal(self):
+        item_events = []
+        items_changed_events = []
+        item_selected_events = []
+
+        def on_item_event(dockgroup, child):
+            item_events.append(child)
+
+        def on_items_changed(dockgroup, added, removed):
+            items_changed_events.append((added, removed))
+
+        def on_item_selected(dockgroup, child):
+            item_selected_events.append(child)
+
+        dockitems = [DockItem() for i in range(4)]
+        dockgroup = DockGroup()
+        dockgroup.connect('item-added', on_item_event)
+        dockgroup.connect('item-removed', on_item_event)
+        dockgroup.connect('items-changed', on_items_changed)
+        dockgroup.connect('item-selected', on_item_selected)
+
+        dockgroup.insert_items(dockitems[:3])
+        self.assertEquals([(dockitems[:3], [])], items_changed_events)
+        self.assertEquals([dockitems[2]], item_selected_events)
+        self.assertEquals(2, dockgroup.get_current_item())
+
+        del items_changed_events[:]
+        with dockgroup.freeze_layout():
+            dockgroup.remove_items(dockitems[1:3])
+            dockgroup.insert_item(dockitems[3])
+            dockgroup.remove(dockitems[3])
+
+        self.assertEquals([([], dockitems[1:3])], items_changed_events)
+        self.assertEquals([dockitems[0]], dockgroup.items)
+        self.assertEquals(0, dockgroup.get_current_item())
+        self.assertEquals([], item_events)
+
+        for dockitem in dockitems:
+            dockitem.destroy()
+        dockgroup.destroy()
+
     ############################################################################
     # Test public api
     ############################################################################
@@ -329,6 +371,293 @@ class TestDockGroup(unittest.TestCase):
         dockitem3.destroy()
         dockgroup.destroy()
 
+    def test_item_num_after_changes(self):
+        dockitems = [DockItem() for i in range(5)]
+        dockgroup = DockGroup()
+        for dockitem in dockitems:
+            dockgroup.add(dockitem)
+
+        dockgroup.reorder_item(dockitems[4], 1)
+        dockgroup.remove(dockitems[0])
+        dockgroup.insert_item(dockitems[0], 2)
+        dockgroup.reorder_item(dockitems[1], 0)
+
+        for dockitem in dockitems:
+            self.assertTrue(dockitem in dockgroup)
+            self.assertEquals(dockgroup.items.index(dockitem), dockgroup.item_num(dockitem))
+
+        dockgroup.set_current_item(3)
+        self.assertEquals(3, dockgroup.get_current_item())
+
+        dockgroup.remove(dockitems[3])
+        self.assertFalse(dockitems[3] in dockgroup)
+        self.assertEquals(None, dockgroup.item_num(dockitems[3]))
+
+        for dockitem in dockitems:
+            dockitem.destroy()
+        dockgroup.destroy()
+
+    def test_tab_sizes(self):
+        dockitem = DockItem(title='short')
+        dockgroup = DockGroup()
+        dockgroup.add(dockitem)
+        dockgroup.size_request()
+        tab = dockgroup._tabs[0]
+        width = tab.area.width
+
+        self.assertTrue(tab.sizes is not None)
+
+        dockitem.set_title('a considerably longer title')
+        self.assertTrue(tab.sizes is None)
+
+        dockgroup.size_request()
+        self.assertTrue(tab.area.width > width)
+
+        dockitem.set_icon_name('gtk-file')
+        self.assertTrue(tab.sizes is None)
+
+        # Switching tabs keeps the measurements
+        other = DockItem(title='other')
+        dockgroup.add(other)
+        dockgroup.size_request()
+        sizes = [t.sizes for t in dockgroup._tabs]
+        dockgroup.set_current_item(0)
+        dockgroup.set_current_item(1)
+        self.assertEquals(sizes, [t.sizes for t in dockgroup._tabs])
+
+        other.destroy()
+        dockitem.destroy()
+        dockgroup.destroy()
+
+    def test_update_visible_tabs(self):
+        dockitems = [DockItem(title=str(i)) for i in range(6)]
+        dockgroup = DockGroup()
+        for dockitem in dockitems:
+            dockgroup.add(dockitem)
+        dockgroup.set_current_item(1)
+
+        for tab in dockgroup._tabs:
+            tab.area.width = 10
+        dockgroup._available_width = 35
+        dockgroup._update_visible_tabs()
+
+        self.assertEquals(3, len(dockgroup.visible_items))
+        self.assertTrue(dockitems[1] in dockgroup.visible_items)
+
+        dockgroup._available_width = 100
+        dockgroup._update_visible_tabs()
+        self.assertEquals(6, len(dockgroup.visible_items))
+
+        dockgroup.remove(dockitems[4])
+        dockgroup._update_visible_tabs()
+        self.assertFalse(dockitems[4] in dockgroup.visible_items)
+
+        for dockitem in dockitems:
+            dockitem.destroy()
+        dockgroup.destroy()
+
+    def test_lazy_tab_widgets(self):
+        dockitems = [DockItem(title=str(i)) for i in range(6)]
+        dockgroup = DockGroup()
+        dockgroup.insert_items(dockitems)
+
+        self.assertEquals([False] * 5 + [True], [tab.button is not None for tab in dockgroup._tabs])
+
+        dockgroup.size_request()
+        for tab in dockgroup._tabs:
+            self.assertTrue(tab.sizes is not None)
+            tab.area.width = 10
+        dockgroup._available_width = 35
+        dockgroup._update_visible_tabs()
+
+        self.assertEquals(3, len([tab for tab in dockgroup._tabs if tab.button is not None]))
+        for tab in dockgroup._visible_tabs:
+            self.assertTrue(tab.button is not None)
+
+        for dockitem in dockitems:
+            dockitem.destroy()
+        dockgroup.destroy()
+
+    def test_windowless_buttons(self):
+        dockitem = DockItem(title='item')
+        dockgroup = DockGroup()
+        dockgroup.add(dockitem)
+
+        window = gtk.Window()
+        window.add(dockgroup)
+        window.show_all()
+
+        while gtk.events_pending():
+            gtk.main_iteration()
+
+        button = dockgroup._tabs[0].button
+        self.assertTrue(button._input_window is None)
+
+        closed = []
+        dockitem.connect('close', closed.append)
+
+        for event_type, signal in ((gdk.MOTION_NOTIFY, 'motion-notify-event'),
+                                   (gdk.BUTTON_PRESS, 'button-press-event'),
+                                   (gdk.BUTTON_RELEASE, 'button-release-event')):
+            event = gdk.Event(event_type)
+            event.window = dockgroup.window
+            event.x = button.allocation.x + button.allocation.width / 2.0
+            event.y = button.allocation.y + button.allocation.height / 2.0
+            if event_type != gdk.MOTION_NOTIFY:
+                event.button = 1
+            dockgroup.emit(signal, event)
+
+        self.assertEquals([dockitem], closed)
+
+        window.destroy()
+
+    def test_remove_item_before_relayout(self):
+        dockitems = [DockItem(title='item %d' % i) for i in range(3)]
+        dockgroup = DockGroup()
+        dockgroup.insert_items(dockitems)
+
+        window = gtk.Window()
+        window.add(dockgroup)
+        window.show_all()
+
+        while gtk.events_pending():
+            gtk.main_iteration()
+
+        removed = dockgroup._tab_map[dockitems[0]]
+        self.assertTrue(removed in dockgroup._visible_tabs)
+
+        # No relayout between removing the item and the following events,
+        # as when a tab drag removes its item from do_motion_notify_event
+        dockgroup.remove(dockitems[0])
+        self.assertFalse(removed in dockgroup._visible_tabs)
+
+        event = gdk.Event(gdk.MOTION_NOTIFY)
+        event.window = dockgroup.window
+        event.x = event.y = 5.0
+        dockgroup.do_motion_notify_event(event)
+
+        event = gdk.Event(gdk.EXPOSE)
+        event.window = dockgroup.window
+        event.area = gdk.Rectangle(0, 0, *window.get_size())
+        dockgroup.do_expose_event(event)
+
+        window.destroy()
+
+    def test_shared_icons(self):
+        windows = []
+
+        for title in ('item 1', 'item 2'):
+            dockgroup = DockGroup()
+            dockgroup.add(DockItem(title=title))
+            window = gtk.Window()
+            window.add(dockgroup)
+            window.show_all()
+            windows.append(window)
+
+        dockgroup1, dockgroup2 = [window.get_child() for window in windows]
+        icon = dockgroup1._tabs[0].button._icon_normal
+
+        self.assertTrue(icon is not None)
+        self.assertTrue(icon is dockgroup2._tabs[0].button._icon_normal)
+        self.assertTrue(dockgroup1._list_button._icon_normal is dockgroup2._list_button._icon_normal)
+
+        for window in windows:
+            window.destroy()
+
+    def test_palette(self):
+        dockgroup = DockGroup()
+        dockgroup._tab_state = gtk.STATE_SELECTED
+        palette = dockgroup._get_palette()
+
+        self.assertEquals(4, len(palette))
+        self.assertTrue(palette is dockgroup._get_palette())
+
+        dockgroup._tab_state = gtk.STATE_PRELIGHT
+        self.assertFalse(palette is dockgroup._get_palette())
+
+        # A new style drops the cached palettes
+        dockgroup._tab_state = gtk.STATE_SELECTED
+        dockgroup.set_style(gtk.Style())
+        self.assertFalse(palette is dockgroup._get_palette())
+
+    def test_tab_surface_cache(self):
+        dockgroup = DockGroup()
+        dockgroup.add(DockItem(title='item'))
+
+        window = gtk.Window()
+        window.set_default_size(300, 200)
+        window.add(dockgroup)
+        window.show_all()
+
+        while gtk.events_pending():
+            gtk.main_iteration()
+
+        surface = dockgroup._tab_surface
+        key = dockgroup._tab_surface_key
+        self.assertTrue(surface is not None)
+
+        dockgroup.queue_draw()
+        while gtk.events_pending():
+            gtk.main_iteration()
+
+        self.assertTrue(dockgroup._tab_surface is surface)
+        self.assertTrue(dockgroup._tab_surface_key is key)
+
+        # The surface only covers the tabs, resizing the group leaves it alone
+        width, height = dockgroup._tab_surface_size
+        self.assertTrue(width < dockgroup.allocation.width)
+        self.assertTrue(height < dockgroup.allocation.height)
+
+        window.resize(400, 300)
+        while gtk.events_pending():
+            gtk.main_iteration()
+
+        self.assertEquals((400, 300), tuple(dockgroup.allocation)[2:])
+        self.assertTrue(dockgroup._tab_surface is surface)
+        self.assertTrue(dockgroup._tab_surface_key is key)
+
+        # Changes to the tabs are drawn into the same surface
+        dockgroup.set_tab_state(gtk.STATE_PRELIGHT)
+        while gtk.events_pending():
+            gtk.main_iteration()
+
+        self.assertFalse(dockgroup._tab_surface_key is key)
+        self.assertTrue(dockgroup._tab_surface is surface)
+
+        window.destroy()
+
+    def test_list_menu(self):
+        dockitems = [DockItem(title='item %d' % i) for i in range(60)]
+        dockgroup = DockGroup()
+        dockgroup._list_menu_rows = 20
+        dockgroup.insert_items(dockitems)
+
+        window = gtk.Window()
+        window.add(dockgroup)
+        window.show_all()
+
+        dockgroup._list_button.emit('clicked')
+        menu = dockgroup._list_menu
+
+        # 20 tabs and a "more" item
+        self.assertEquals(21, len(menu.get_children()))
+
+        event = gdk.Event(gdk.KEY_PRESS)
+        event.keyval = gdk.keyval_from_name('5')
+        menu.emit('key-press-event', event)
+
+        # The filter text, item 5, item 15, ... item 55
+        self.assertEquals(7, len(menu.get_children()))
+
+        event.keyval = gdk.keyval_from_name('BackSpace')
+        menu.emit('key-press-event', event)
+        self.assertEquals(21, len(menu.get_children()))
+
+        menu.emit('selection-done')
+        self.assertEquals([], menu.get_children())
+
+        window.destroy()
+
     def test_add_signal(self):
         events = []
         item_in = []
@@ -22,6 +22,8 @@
 from __future__ import print_function
 from builtins import object
 from builtins import map
+import subprocess
+import sys
 import unittest
 
 import pygtk
@@ -88,6 +90,42 @@ class TestDockLayout(unittest.TestCase):
         assert item not in list(layout._signal_handlers.keys()), layout._signal_handlers
         assert frame in layout.frames
 
+    def test_batched_changes(self):
+        win = gtk.Window(gtk.WINDOW_TOPLEVEL)
+        frame = DockFrame()
+        paned = DockPaned()
+        group = DockGroup()
+        items = [DockItem() for i in range(3)]
+
+        layout = DockLayout()
+
+        layout.add(frame)
+
+        win.add(frame)
+        frame.add(paned)
+        paned.add(group)
+        group.insert_items(items)
+
+        self.assertEquals(6, len(layout._signal_handlers))
+        for item in items:
+            assert layout.is_dirty(item)
+
+        layout.mark_clean(group)
+        group.remove_items(items[:2])
+
+        self.assertEquals(4, len(layout._signal_handlers), layout._signal_handlers)
+        assert items[2] in list(layout._signal_handlers.keys()), layout._signal_handlers
+        assert items[0] not in list(layout._signal_handlers.keys()), layout._signal_handlers
+        assert layout.is_dirty(group)
+
+    def test_lazy_import(self):
+        # Run in a new interpreter, other tests import DockLayout already
+        script = ('import sys, etkdocking; '
+                  'assert "etkdocking.docklayout" not in sys.modules; '
+                  'from etkdocking import DockLayout; '
+                  'assert "etkdocking.docklayout" in sys.modules')
+        self.assertEquals(0, subprocess.call([sys.executable, '-c', script]))
+
     def test_get_widgets(self):
         win = gtk.Window(gtk.WINDOW_TOPLEVEL)
         frame = DockFrame()
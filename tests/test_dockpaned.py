@@ -221,6 +221,40 @@ class TestDockPaned(unittest.TestCase):
         dockgroup2.destroy()
         dockpaned.destroy()
 
+    def test_items_changed_signal(self):
+        item_events = []
+        items_changed_events = []
+
+        def on_item_event(dockpaned, child):
+            item_events.append(child)
+
+        def on_items_changed(dockpaned, added, removed):
+            items_changed_events.append((added, removed))
+
+        dockgroups = [DockGroup() for i in range(4)]
+        dockpaned = DockPaned()
+        dockpaned.connect('item-added', on_item_event)
+        dockpaned.connect('item-removed', on_item_event)
+        dockpaned.connect('items-changed', on_items_changed)
+
+        dockpaned.insert_items(dockgroups[:3])
+        self.assertEquals([(dockgroups[:3], [])], items_changed_events)
+        self.assertEquals(dockgroups[:3], dockpaned.get_children())
+
+        del items_changed_events[:]
+        with dockpaned.freeze_layout():
+            dockpaned.remove_items(dockgroups[:2])
+            dockpaned.insert_item(dockgroups[3], 0)
+            dockpaned.remove(dockgroups[3])
+
+        self.assertEquals([([], dockgroups[:2])], items_changed_events)
+        self.assertEquals([dockgroups[2]], dockpaned.get_children())
+        self.assertEquals([], item_events)
+
+        for dockgroup in dockgroups:
+            dockgroup.destroy()
+        dockpaned.destroy()
+
     ############################################################################
     # Test protected api
     ############################################################################
@@ -279,6 +313,100 @@ class TestDockPaned(unittest.TestCase):
         self.assertAlmostEquals(0.5, dockpaned._items[0].weight, 4)
         self.assertAlmostEquals(0.5, dockpaned._items[1].weight, 4)
 
+    def test_size_allocate_unchanged(self):
+        dockpaned = DockPaned()
+        dockgroup1 = DockGroup()
+        dockgroup2 = DockGroup()
+        dockpaned.add(dockgroup1)
+        dockpaned.add(dockgroup2)
+        window = gtk.Window()
+        window.add(dockpaned)
+        window.show_all()
+
+        calls = []
+        redistribute_weight = dockpaned._redistribute_weight
+
+        def _redistribute_weight(size):
+            calls.append(size)
+            redistribute_weight(size)
+
+        dockpaned._redistribute_weight = _redistribute_weight
+        allocation = dockgroup2.allocation
+
+        DockPaned.do_size_allocate(dockpaned, dockpaned.allocation)
+        self.assertEquals([], calls)
+        self.assertEquals(allocation, dockgroup2.allocation)
+
+        dockpaned.child_set_property(dockgroup2, 'weight', 0.3)
+        DockPaned.do_size_allocate(dockpaned, dockpaned.allocation)
+        self.assertEquals(1, len(calls))
+
+        dockgroup1.destroy()
+        dockgroup2.destroy()
+        dockpaned.destroy()
+        window.destroy()
+
+    def test_handle_drag_coalesced(self):
+        dockpaned = DockPaned()
+        dockgroup1 = DockGroup()
+        dockgroup2 = DockGroup()
+        dockpaned.add(dockgroup1)
+        dockpaned.add(dockgroup2)
+        window = gtk.Window()
+        window.set_default_size(400, 200)
+        window.add(dockpaned)
+        window.show_all()
+
+        while gtk.events_pending():
+            gtk.main_iteration()
+
+        calls = []
+        apply_handle_drag = dockpaned._apply_handle_drag
+
+        def _apply_handle_drag():
+            calls.append(dockpaned._drag_position)
+            apply_handle_drag()
+
+        dockpaned._apply_handle_drag = _apply_handle_drag
+        handle = dockpaned._handles[0]
+
+        event = gdk.Event(gdk.BUTTON_PRESS)
+        event.window = dockpaned.window
+        event.button = 1
+        event.x = float(handle.area.x)
+        event.y = float(handle.area.y + 1)
+        self.assertTrue(dockpaned.do_button_press_event(event))
+
+        # Motion events that come in before the idle callback runs are
+        # applied at once, at the last position
+        for x in (handle.area.x - 40, handle.area.x - 50, handle.area.x - 60):
+            event = gdk.Event(gdk.MOTION_NOTIFY)
+            event.window = dockpaned.window
+            event.x = float(x)
+            event.y = float(handle.area.y + 1)
+            dockpaned.do_motion_notify_event(event)
+
+        self.assertEquals([], calls)
+        last = x
+
+        while gtk.events_pending():
+            gtk.main_iteration()
+
+        self.assertEquals([last], calls)
+        # Weights may round the new position by a pixel
+        self.assertTrue(abs(dockpaned._handles[0].area.x - last) <= 1, dockpaned._handles[0].area.x)
+
+        event = gdk.Event(gdk.BUTTON_RELEASE)
+        event.window = dockpaned.window
+        event.button = 1
+        dockpaned.do_button_release_event(event)
+        self.assertEquals([last], calls)
+
+        dockgroup1.destroy()
+        dockgroup2.destroy()
+        dockpaned.destroy()
+        window.destroy()
+
     ############################################################################
     # Test public api
     ############################################################################
@@ -406,6 +534,29 @@ class TestDockPaned(unittest.TestCase):
         dockgroup1.destroy()
         dockpaned.destroy()
 
+    def test_item_num_after_changes(self):
+        dockgroups = [DockGroup() for i in range(5)]
+        dockpaned = DockPaned()
+        for dockgroup in dockgroups:
+            dockpaned.add(dockgroup)
+
+        dockpaned.reorder_item(dockgroups[4], 1)
+        dockpaned.remove(dockgroups[0])
+        dockpaned.insert_item(dockgroups[0], 2)
+        dockpaned.reorder_item(dockgroups[1], 0)
+
+        for dockgroup in dockgroups:
+            self.assertTrue(dockgroup in dockpaned)
+            self.assertEquals(dockpaned.get_children().index(dockgroup), dockpaned.item_num(dockgroup))
+
+        dockpaned.remove(dockgroups[3])
+        self.assertFalse(dockgroups[3] in dockpaned)
+        self.assertEquals(None, dockpaned.item_num(dockgroups[3]))
+
+        for dockgroup in dockgroups:
+            dockgroup.destroy()
+        dockpaned.destroy()
+
     def test_len(self):
         dockgroup1 = DockGroup()
         dockgroup2 = DockGroup()
@@ -470,6 +621,31 @@ class TestDockPaned(unittest.TestCase):
         dockpaned.destroy()
         window.destroy()
 
+    def test_get_handle_at_pos(self):
+        dockgroups = [DockGroup() for i in range(4)]
+        dockpaned = DockPaned()
+        for dockgroup in dockgroups:
+            dockpaned.add(dockgroup)
+        window = gtk.Window()
+        window.add(dockpaned)
+        window.show_all()
+
+        for handle in dockpaned._handles:
+            self.assertTrue(dockpaned._get_handle_at_pos(handle.area.x + 1, handle.area.y + 1) is handle)
+
+        dockgroup = dockgroups[1]
+        self.assertEquals(None, dockpaned._get_handle_at_pos(dockgroup.allocation.x + 2,
+                                                             dockgroup.allocation.y + 2))
+
+        # Handles are not hit until the dockpaned has been allocated again
+        dockpaned.remove(dockgroups[3])
+        self.assertEquals(None, dockpaned._get_handle_index_at_pos(0, 0))
+
+        for dockgroup in dockgroups:
+            dockgroup.destroy()
+        dockpaned.destroy()
+        window.destroy()
+
     def test_reorder_item(self):
         dockgroup1 = DockGroup()
         dockgroup2 = DockGroup()
@@ -1,14 +1,28 @@
 # vim:sw=4:et:ai
 from builtins import object
 from builtins import next
+import os
+import shutil
+import sys
+import tempfile
+import threading
 import unittest
+from io import BytesIO
+from xml.etree.ElementTree import Element, SubElement, tostring
 
 import pygtk
 
 pygtk.require('2.0')
+import gobject
 import gtk
+
+# The background loaders hand their results to the main loop
+gobject.threads_init()
 from etkdocking import DockLayout, DockFrame, DockPaned, DockGroup, DockItem
-from etkdocking.dockstore import serialize, deserialize, get_main_frames, finish
+from etkdocking import dockstore
+from etkdocking.dockstore import serialize, serialize_to, serialize_incremental, deserialize,\
+    serialize_binary, deserialize_binary, get_main_frames, finish, compile_plan, \
+    diff, patch, attributes, SERIALIZABLE
 
 
 class ItemFactory(object):
@@ -17,6 +31,24 @@ class ItemFactory(object):
         return gtk.Button(label)
 
 
+def serialize_etree(layout, encoding=None):
+    '''
+    serialize() as it was implemented on top of ElementTree.
+    '''
+    def _ser(widget, element):
+        if isinstance(widget, SERIALIZABLE):
+            sub = SubElement(element, type(widget).__name__.lower(), attributes(widget))
+            widget.foreach(_ser, sub)
+        else:
+            sub = SubElement(element, 'widget', attributes(widget))
+
+    tree = Element('layout')
+    for frame in layout.frames:
+        _ser(frame, tree)
+
+    return tostring(tree, encoding=encoding or sys.getdefaultencoding())
+
+
 class LoadingTestCase(unittest.TestCase):
 
     def test_serialize(self):
@@ -42,6 +74,78 @@ class LoadingTestCase(unittest.TestCase):
                      b'</dockgroup></dockpaned></dockframe></layout>'
                      ) == s, s
 
+    def test_serialize_to(self):
+        win = gtk.Window(gtk.WINDOW_TOPLEVEL)
+        layout = DockLayout()
+        frame = DockFrame()
+        win.add(frame)
+        layout.add(frame)
+        paned = DockPaned()
+        frame.add(paned)
+        group = DockGroup()
+        paned.add(group)
+        item = DockItem(title='t "1" & <2>', title_tooltip_text='xx')
+        item.add(gtk.Button())
+        item.child.set_name('fillme')
+        group.add(item)
+
+        out = BytesIO()
+        serialize_to(layout, out)
+
+        self.assertEquals(serialize(layout), out.getvalue())
+        self.assertEquals(serialize_etree(layout), out.getvalue())
+        assert b'title="t &quot;1&quot; &amp; &lt;2&gt;"' in out.getvalue(), out.getvalue()
+        assert b'<widget name="fillme" /></dockitem>' in out.getvalue(), out.getvalue()
+
+    def test_serialize_to_declaration(self):
+        layout = DockLayout()
+        self.assertEquals(serialize_etree(layout), serialize(layout))
+
+        frame = DockFrame()
+        layout.add(frame)
+        paned = DockPaned()
+        frame.add(paned)
+        group = DockGroup()
+        paned.add(group)
+        group.add(DockItem(title='t "1" & <2>', title_tooltip_text='xx'))
+
+        for encoding in ('ascii', 'utf-8', 'iso-8859-1'):
+            out = BytesIO()
+            serialize_to(layout, out, encoding)
+            self.assertEquals(serialize_etree(layout, encoding), out.getvalue())
+
+    def test_serialize_incremental(self):
+        win = gtk.Window(gtk.WINDOW_TOPLEVEL)
+        layout = DockLayout()
+        frame = DockFrame()
+        win.add(frame)
+        layout.add(frame)
+        paned = DockPaned()
+        frame.add(paned)
+        group1 = DockGroup()
+        paned.add(group1)
+        group2 = DockGroup()
+        paned.add(group2)
+        item1 = DockItem(title='one')
+        group1.add(item1)
+        item2 = DockItem(title='two')
+        group2.add(item2)
+
+        out = BytesIO()
+        serialize_incremental(layout, out)
+        self.assertEquals(serialize(layout), out.getvalue())
+        assert not layout.is_dirty(group1)
+        assert not layout.is_dirty(group2)
+
+        item2.set_title('three')
+        assert not layout.is_dirty(group1)
+        assert layout.is_dirty(group2)
+
+        out = BytesIO()
+        serialize_incremental(layout, out)
+        self.assertEquals(serialize(layout), out.getvalue())
+        assert b'title="three"' in out.getvalue(), out.getvalue()
+
     def test_deserialize(self):
         xml = '''
         <layout>
@@ -123,3 +227,477 @@ class LoadingTestCase(unittest.TestCase):
         win.show_all()
 
         self.assertEquals(0.45, main_frames[0].get_children()[0]._items[0].weight)
+
+    def test_binary_round_trip(self):
+        xml = """
+        <layout>
+          <dockframe height="100" width="492">
+            <dockpaned orientation="horizontal">
+              <dockgroup weight="45">
+                <dockitem title="New 3" tooltip="Hi!" icon_name="file-manager" stock_id="">
+                  <widget name="fillme" />
+                </dockitem>
+              </dockgroup>
+              <dockgroup weight="55" name="documents">
+                <dockitem title="New 1" tooltip="browser" icon_name="web-browser" stock_id=""/>
+              </dockgroup>
+            </dockpaned>
+          </dockframe>
+        </layout>
+        """
+
+        layout = deserialize(xml, ItemFactory())
+        frame = next(iter(layout.frames))
+        win = gtk.Window()
+        win.add(frame)
+        win.show_all()
+        paned = frame.child
+        paned._items[0].weight = 1 / 3.
+        paned._items[1].weight = 2 / 3.
+
+        data = serialize_binary(layout)
+        copy = deserialize_binary(data, ItemFactory())
+
+        paned_copy = next(iter(copy.frames)).child
+        self.assertEquals(gtk.ORIENTATION_HORIZONTAL, paned_copy.get_orientation())
+        self.assertEquals(1 / 3., paned_copy._items[0].weight_request)
+        self.assertEquals(2 / 3., paned_copy._items[1].weight_request)
+        self.assertEquals('documents', paned_copy[1].get_name())
+        item = paned_copy[0].get_nth_item(0)
+        self.assertEquals('New 3', item.get_title())
+        self.assertEquals('Hi!', item.get_title_tooltip_text())
+        self.assertEquals('file-manager', item.get_icon_name())
+        self.assertEquals('fillme', item.child.get_label())
+
+    def test_binary_long_strings(self):
+        layout = DockLayout()
+        frame = DockFrame()
+        layout.add(frame)
+        paned = DockPaned()
+        frame.add(paned)
+        group = DockGroup()
+        paned.add(group)
+        tooltip = 'x' * 70000
+        group.add(DockItem(title='long', title_tooltip_text=tooltip))
+
+        copy = deserialize_binary(serialize_binary(layout), ItemFactory())
+
+        item = next(iter(copy.frames)).child[0].get_nth_item(0)
+        self.assertEquals('long', item.get_title())
+        self.assertEquals(tooltip, item.get_title_tooltip_text())
+
+    def test_deserialize_lazy(self):
+        xml = """
+        <layout>
+          <dockframe height="100" width="492">
+            <dockgroup>
+              <dockitem title="one" tooltip="">
+                <widget name="first" />
+              </dockitem>
+              <dockitem title="two" tooltip="">
+                <widget name="second" />
+              </dockitem>
+            </dockgroup>
+          </dockframe>
+        </layout>
+        """
+        created = []
+
+        def itemfactory(name):
+            created.append(name)
+            return gtk.Button(name)
+
+        layout = deserialize(xml, itemfactory, lazy=True)
+        group = next(iter(layout.frames)).child
+        self.assertEquals(['second'], created)
+        self.assertEquals(None, group.get_nth_item(0).child)
+
+        s = serialize(layout)
+        assert b'<widget name="first" />' in s, s
+        assert b'<widget name="second" />' in s, s
+
+        group.set_current_item(0)
+        self.assertEquals(['second', 'first'], created)
+        self.assertEquals('first', group.get_nth_item(0).child.get_label())
+
+    def test_deserialize_loader(self):
+        xml = """
+        <layout>
+          <dockframe height="100" width="492">
+            <dockgroup>
+              <dockitem title="one" tooltip="">
+                <widget name="first" />
+              </dockitem>
+              <dockitem title="two" tooltip="">
+                <widget name="second" />
+              </dockitem>
+            </dockgroup>
+          </dockframe>
+        </layout>
+        """
+
+        def loader(name):
+            return name.upper()
+
+        def itemfactory(name, data):
+            return gtk.Button(data)
+
+        layout = deserialize(xml, itemfactory, loader=loader, workers=1)
+        group = next(iter(layout.frames)).child
+        self.assertEquals(None, group.get_nth_item(0).child)
+        self.assertEquals(None, group.get_nth_item(1).child)
+
+        # Selecting an item that has not been loaded yet loads it on the spot
+        group.set_current_item(0)
+        self.assertEquals('FIRST', group.get_nth_item(0).child.get_label())
+
+        while group.get_nth_item(1).child is None:
+            gtk.main_iteration()
+        self.assertEquals('SECOND', group.get_nth_item(1).child.get_label())
+
+    def test_deserialize_loader_selected_while_loading(self):
+        xml = """
+        <layout>
+          <dockframe height="100" width="492">
+            <dockgroup>
+              <dockitem title="one" tooltip="">
+                <widget name="first" />
+              </dockitem>
+              <dockitem title="two" tooltip="">
+                <widget name="second" />
+              </dockitem>
+              <dockitem title="three" tooltip="">
+                <widget name="third" />
+              </dockitem>
+            </dockgroup>
+          </dockframe>
+        </layout>
+        """
+        loading = threading.Event()
+        release = threading.Event()
+        loaded = []
+        created = []
+
+        def loader(name):
+            loaded.append(name)
+            if name == 'third':
+                loading.set()
+                release.wait(5)
+            return name.upper()
+
+        def itemfactory(name, data):
+            created.append(name)
+            return gtk.Button(data)
+
+        layout = deserialize(xml, itemfactory, loader=loader, workers=1)
+        group = next(iter(layout.frames)).child
+
+        # The worker loads the current item, 'third', the others are queued
+        self.assertTrue(loading.wait(5))
+
+        # A queued item is loaded right away, the worker does not load it again
+        group.set_current_item(0)
+        self.assertEquals('FIRST', group.get_nth_item(0).child.get_label())
+
+        # Selecting the item the worker is loading waits for the worker
+        timer = threading.Timer(0.1, release.set)
+        timer.start()
+        group.set_current_item(2)
+        self.assertEquals('THIRD', group.get_nth_item(2).child.get_label())
+
+        while group.get_nth_item(1).child is None:
+            gtk.main_iteration()
+        while gtk.events_pending():
+            gtk.main_iteration()
+
+        self.assertEquals(['first', 'second', 'third'], sorted(loaded))
+        self.assertEquals(['first', 'second', 'third'], sorted(created))
+
+    def test_loader_failure(self):
+        failures = [IOError('not yet')]
+
+        def loader(name):
+            if failures:
+                raise failures.pop()
+            return name.upper()
+
+        def itemfactory(name, data):
+            return gtk.Button(data)
+
+        group = DockGroup()
+        group.add(DockItem(title='zero'))
+        item = DockItem(title='one')
+        group.add(item)
+        group.set_current_item(0)
+        item.set_child_factory(dockstore._DeferredChild(itemfactory, 'first', loader))
+
+        # A failed load leaves the item empty, selecting it again retries
+        group.set_current_item(1)
+        self.assertEquals(None, item.child)
+        self.assertTrue(item.get_child_factory() is not None)
+
+        group.set_current_item(0)
+        group.set_current_item(1)
+        self.assertEquals('FIRST', item.child.get_label())
+        self.assertEquals(None, item.get_child_factory())
+
+    def test_deserialize_cached_plan(self):
+        xml = """
+        <layout>
+          <dockframe height="100" width="492">
+            <dockpaned orientation="horizontal">
+              <dockgroup weight="40">
+                <dockitem title="one" tooltip="" pos="0">
+                  <widget name="first" />
+                </dockitem>
+              </dockgroup>
+              <dockgroup weight="60">
+                <dockitem title="two" tooltip="">
+                  <widget name="second" />
+                </dockitem>
+              </dockgroup>
+            </dockpaned>
+          </dockframe>
+        </layout>
+        """
+        plan = compile_plan(xml)
+        self.assertEquals((-1, 'dockframe', {'width': 492, 'height': 100}), plan[0])
+        self.assertEquals((1, 'dockgroup', {'weight': 0.4}), plan[2])
+        self.assertEquals((1, 'dockgroup', {'weight': 0.6}), plan[5])
+
+        cache_dir = tempfile.mkdtemp()
+        try:
+            layout = deserialize(xml, ItemFactory(), cache_dir=cache_dir)
+            self.assertEquals(1, len(os.listdir(cache_dir)))
+
+            cached = deserialize(xml, ItemFactory(), cache_dir=cache_dir)
+            self.assertEquals(1, len(os.listdir(cache_dir)))
+            self.assertEquals(serialize(layout), serialize(cached))
+
+            # Cache files are plain data, anything else is ignored
+            (name,) = os.listdir(cache_dir)
+            with open(os.path.join(cache_dir, name), 'wb') as f:
+                f.write(b'cos\nsystem\n(S"false"\ntR.')
+            cached = deserialize(xml, ItemFactory(), cache_dir=cache_dir)
+            self.assertEquals(serialize(layout), serialize(cached))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_cached_plan_pruning(self):
+        cache_dir = tempfile.mkdtemp()
+        cache_size = dockstore.PLAN_CACHE_SIZE
+        dockstore.PLAN_CACHE_SIZE = 2
+        try:
+            for width in (100, 200, 300):
+                xml = '<layout><dockframe height="100" width="%d" /></layout>' % width
+                deserialize(xml, ItemFactory(), cache_dir=cache_dir)
+
+            self.assertEquals(2, len(os.listdir(cache_dir)))
+        finally:
+            dockstore.PLAN_CACHE_SIZE = cache_size
+            shutil.rmtree(cache_dir)
+
+    def test_diff_patch(self):
+        xml = """
+        <layout>
+          <dockframe height="100" width="492">
+            <dockpaned orientation="horizontal">
+              <dockgroup weight="40">
+                <dockitem title="one" tooltip="">
+                  <widget name="first" />
+                </dockitem>
+                <dockitem title="two" tooltip="">
+                  <widget name="second" />
+                </dockitem>
+                <dockitem title="three" tooltip="">
+                  <widget name="third" />
+                </dockitem>
+              </dockgroup>
+              <dockgroup weight="60">
+                <dockitem title="four" tooltip="">
+                  <widget name="fourth" />
+                </dockitem>
+              </dockgroup>
+            </dockpaned>
+          </dockframe>
+        </layout>
+        """
+        target = """
+        <layout>
+          <dockframe height="100" width="492">
+            <dockpaned orientation="vertical">
+              <dockgroup weight="70">
+                <dockitem title="two" tooltip="">
+                  <widget name="second" />
+                </dockitem>
+                <dockitem title="three" tooltip="">
+                  <widget name="third" />
+                </dockitem>
+                <dockitem title="one" tooltip="">
+                  <widget name="first" />
+                </dockitem>
+              </dockgroup>
+              <dockgroup weight="30">
+                <dockitem title="five" tooltip="">
+                  <widget name="fifth" />
+                </dockitem>
+              </dockgroup>
+            </dockpaned>
+          </dockframe>
+        </layout>
+        """
+        layout = deserialize(xml, ItemFactory())
+        paned = next(iter(layout.frames)).child
+        group = paned.get_nth_item(0)
+        first, second, third = group.items
+        fourth = paned.get_nth_item(1).items[0]
+
+        ops = diff(layout, target)
+        self.assertEquals([('remove', fourth)], ops[:1])
+        self.assertEquals(1, len([op for op in ops if op[0] == 'move']))
+        self.assertEquals(1, len([op for op in ops if op[0] == 'insert']))
+
+        removed = patch(layout, ops, ItemFactory())
+        self.assertEquals([fourth], removed)
+        self.assertTrue(paned is next(iter(layout.frames)).child)
+        self.assertEquals([second, third, first], paned.get_nth_item(0).items)
+        self.assertEquals(serialize(deserialize(target, ItemFactory())), serialize(layout))
+        self.assertEquals([], diff(layout, target)[1:])
+
+    def test_serialize_incremental_after_changes(self):
+        xml = """
+        <layout>
+          <dockframe height="100" width="492">
+            <dockpaned orientation="horizontal">
+              <dockgroup weight="40">
+                <dockitem title="one" tooltip="">
+                  <widget name="first" />
+                </dockitem>
+                <dockitem title="two" tooltip="">
+                  <widget name="second" />
+                </dockitem>
+              </dockgroup>
+              <dockgroup weight="60">
+                <dockitem title="three" tooltip="">
+                  <widget name="third" />
+                </dockitem>
+              </dockgroup>
+            </dockpaned>
+          </dockframe>
+        </layout>
+        """
+        target = """
+        <layout>
+          <dockframe height="100" width="492">
+            <dockpaned orientation="horizontal">
+              <dockgroup weight="40">
+                <dockitem title="one" tooltip="">
+                  <widget name="first" />
+                </dockitem>
+                <dockitem title="two" tooltip="">
+                  <widget name="second" />
+                </dockitem>
+                <dockitem title="three" tooltip="">
+                  <widget name="third" />
+                </dockitem>
+              </dockgroup>
+              <dockgroup weight="60">
+                <dockitem title="four" tooltip="">
+                  <widget name="fourth" />
+                </dockitem>
+              </dockgroup>
+            </dockpaned>
+          </dockframe>
+        </layout>
+        """
+
+        def check(layout):
+            out = BytesIO()
+            serialize_incremental(layout, out)
+            self.assertEquals(serialize(layout), out.getvalue())
+
+        layout = deserialize(xml, ItemFactory())
+        paned = next(iter(layout.frames)).child
+        group1, group2 = paned.get_children()
+        check(layout)
+
+        group1.reorder_item(group1.items[1], 0)
+        check(layout)
+
+        paned.reorder_item(group2, 0)
+        check(layout)
+        paned.reorder_item(group2, 1)
+        check(layout)
+
+        item = group2.items[0]
+        item.remove(item.child)
+        check(layout)
+        button = gtk.Button()
+        button.set_name('other')
+        item.add(button)
+        check(layout)
+        assert b'<widget name="other" />' in serialize(layout)
+
+        item.remove(button)
+        button = gtk.Button()
+        button.set_name('third')
+        item.add(button)
+        check(layout)
+
+        # Moves "one" back in front of "two" within the group
+        ops = diff(layout, target)
+        self.assertTrue([op for op in ops if op[0] == 'move' and op[2] == (0, 0, 0)])
+        patch(layout, ops, ItemFactory())
+        check(layout)
+        self.assertEquals(serialize(deserialize(target, ItemFactory())), serialize(layout))
+
+    def test_diff_patch_group_name(self):
+        xml = """
+        <layout>
+          <dockframe height="100" width="492">
+            <dockpaned orientation="horizontal">
+              <dockgroup weight="40" name="left">
+                <dockitem title="one" tooltip="">
+                  <widget name="first" />
+                </dockitem>
+              </dockgroup>
+              <dockgroup weight="60">
+                <dockitem title="two" tooltip="">
+                  <widget name="second" />
+                </dockitem>
+              </dockgroup>
+            </dockpaned>
+          </dockframe>
+        </layout>
+        """
+        target = """
+        <layout>
+          <dockframe height="100" width="492">
+            <dockpaned orientation="horizontal">
+              <dockgroup weight="40">
+                <dockitem title="one" tooltip="">
+                  <widget name="first" />
+                </dockitem>
+              </dockgroup>
+              <dockgroup weight="60" name="right">
+                <dockitem title="two" tooltip="">
+                  <widget name="second" />
+                </dockitem>
+              </dockgroup>
+            </dockpaned>
+          </dockframe>
+        </layout>
+        """
+        layout = deserialize(xml, ItemFactory())
+        paned = next(iter(layout.frames)).child
+        group1, group2 = paned.get_children()
+
+        ops = diff(layout, target)
+        self.assertEquals([('name', (0, 0, 0), None), ('name', (0, 0, 1), 'right')],
+                          [op for op in ops if op[0] == 'name'])
+
+        patch(layout, ops, ItemFactory())
+        self.assertEquals([group1, group2], paned.get_children())
+        self.assertEquals('right', group2.get_name())
+        self.assertEquals(serialize(deserialize(target, ItemFactory())), serialize(layout))
+        self.assertEquals([], [op for op in diff(layout, target) if op[0] == 'name'])